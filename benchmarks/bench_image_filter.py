@@ -0,0 +1,93 @@
+"""Micro-benchmark ImageQualityFilter's NumPy analyzer against the previous PIL checks.
+
+Usage: python benchmarks/bench_image_filter.py [--images 200] [--size 1200]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageStat
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pdf_engine import ImageQualityFilter  # noqa: E402
+
+
+def pil_checks(img, min_unique_colors=10, min_std=15):
+    """The former _has_sufficient_complexity/_has_sufficient_variance pair"""
+    gray = img.convert('L')
+    if gray.width * gray.height > 250000:
+        gray.thumbnail((500, 500), Image.Resampling.LANCZOS)
+    colors = gray.getcolors(maxcolors=256 * 256)
+    complex_enough = not colors or len(colors) >= min_unique_colors
+
+    gray = img.convert('L')
+    if gray.width * gray.height > 250000:
+        gray.thumbnail((500, 500), Image.Resampling.LANCZOS)
+    stat = ImageStat.Stat(gray)
+    return complex_enough and stat.stddev[0] >= min_std
+
+
+def numpy_checks(img):
+    stats = ImageQualityFilter.analyze(img)
+    return (stats.unique_levels >= ImageQualityFilter.MIN_UNIQUE_LEVELS
+            and stats.std_dev >= ImageQualityFilter.MIN_STD_DEV)
+
+
+def make_images(count, size, seed=0):
+    """A mix of scanned-text-like, photo-like, flat, two-tone and bilevel (CCITT/JBIG2-style) images"""
+    rng = np.random.default_rng(seed)
+    images = []
+    for i in range(count):
+        kind = i % 5
+        if kind == 0:
+            img = Image.new("L", (size, size), 255)
+            draw = ImageDraw.Draw(img)
+            for line in range(0, size, 24):
+                draw.text((10, line), "The quick brown fox jumps over the lazy dog " * 3, fill=0)
+        elif kind == 1:
+            img = Image.fromarray((rng.random((size, size, 3)) * 255).astype("uint8"))
+        elif kind == 2:
+            img = Image.new("RGB", (size, size), tuple(int(v) for v in rng.integers(0, 255, 3)))
+        elif kind == 3:
+            pixels = np.full((size, size), 200, dtype=np.uint8)
+            pixels[: size // 2] = 40
+            img = Image.fromarray(pixels)
+        else:
+            # 1-bit text scan as fitz decodes it: only 0 and 255
+            img = Image.new("1", (size, size), 1)
+            draw = ImageDraw.Draw(img)
+            for line in range(0, size, 24):
+                draw.text((10, line), "The quick brown fox jumps over the lazy dog " * 3, fill=0)
+            img = img.convert("L")
+        images.append(img)
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--size", type=int, default=1200)
+    args = parser.parse_args()
+
+    images = make_images(args.images, args.size)
+
+    started = time.perf_counter()
+    old = [pil_checks(img) for img in images]
+    pil_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    new = [numpy_checks(img) for img in images]
+    numpy_seconds = time.perf_counter() - started
+
+    agree = sum(a == b for a, b in zip(old, new))
+    print(f"images: {len(images)} at {args.size}x{args.size}")
+    print(f"PIL checks:     {pil_seconds * 1000 / len(images):7.2f} ms/image")
+    print(f"NumPy analyzer: {numpy_seconds * 1000 / len(images):7.2f} ms/image "
+          f"({pil_seconds / numpy_seconds:.1f}x faster)")
+    print(f"decisions agree: {agree}/{len(images)}")
+
+
+if __name__ == "__main__":
+    main()
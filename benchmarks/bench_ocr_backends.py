@@ -0,0 +1,68 @@
+"""Time each available OCR backend (see pdf_engine.OCR_BACKENDS) on small text images.
+
+Reports ms/image for text and word-data output, and whether each backend's text matches pytesseract's.
+Needs the tesseract binary.
+
+Usage: python benchmarks/bench_ocr_backends.py [--images 40] [--threads 1 4]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pdf_engine import available_ocr_backends, run_ocr, use_ocr_backend  # noqa: E402
+
+WORDS = "invoice total amount payable account number reference period balance statement".split()
+
+
+def make_images(count, seed=0):
+    """Word-sized crops like the ones extract_ocr sees: a few lines of black text on white"""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        img = Image.new("L", (420, 90), 255)
+        draw = ImageDraw.Draw(img)
+        for line in range(3):
+            draw.text((8, 8 + line * 26), " ".join(rng.choice(WORDS, size=5)), fill=0)
+        images.append(img)
+    return images
+
+
+def timed(images, output, threads):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(lambda img: run_ocr(img, "--psm 6", output=output), images))
+    return (time.perf_counter() - started) * 1000 / len(images), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    images = make_images(args.images)
+    backends = available_ocr_backends()
+    print(f"available backends: {', '.join(backends)}")
+
+    use_ocr_backend("pytesseract")
+    _, reference = timed(images, "string", 1)
+
+    print(f"{'backend':<13}{'threads':>8}{'string ms':>11}{'data ms':>9}  matches pytesseract")
+    for name in backends:
+        use_ocr_backend(name)
+        run_ocr(images[0], "--psm 6")  # load the model outside the timing
+        for threads in args.threads:
+            string_ms, texts = timed(images, "string", threads)
+            data_ms, _ = timed(images, "data", threads)
+            matches = sum(a.strip() == b.strip() for a, b in zip(texts, reference))
+            print(f"{name:<13}{threads:>8}{string_ms:>11.1f}{data_ms:>9.1f}  {matches}/{len(images)}")
+
+
+if __name__ == "__main__":
+    main()
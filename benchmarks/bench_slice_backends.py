@@ -0,0 +1,75 @@
+"""Compare the PyPDF2 and fitz slicing backends for speed, output size and page fidelity.
+
+Each output page is checked against its source page: same text and same images.
+
+Usage: python benchmarks/bench_slice_backends.py [--kinds text scanned] [--pages 200 1000] [--max-size-mb 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+from corpus import DEFAULT_DIR, KINDS, corpus_path  # noqa: E402
+from pdf_engine import PDFEngine, ProcessingOptions, release_document  # noqa: E402
+
+
+def page_signature(page):
+    images = sorted((img[2], img[3]) for img in page.get_images())
+    return page.get_text(), images
+
+
+def pages_identical(pdf_path, output_dir):
+    """True when the output parts, in order, reproduce every source page"""
+    parts = sorted((name for name in os.listdir(output_dir) if name.endswith(".pdf")),
+                   key=lambda name: int(name.rsplit("_", 1)[-1].split(".")[0].split("-")[0]))
+    with fitz.open(pdf_path) as source:
+        expected = [page_signature(page) for page in source]
+    actual = []
+    for name in parts:
+        with fitz.open(os.path.join(output_dir, name)) as part:
+            actual.extend(page_signature(page) for page in part)
+    return actual == expected
+
+
+def run(pdf_path, output_dir, operation, backend, max_size_mb):
+    options = ProcessingOptions(pdf_path=pdf_path, output_dir=output_dir, operation=operation,
+                                max_size_mb=max_size_mb, slice_backend=backend)
+    release_document(pdf_path)  # time the parse as part of the run
+    started = time.perf_counter()
+    PDFEngine(options).run()
+    elapsed = time.perf_counter() - started
+    sizes = [os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir)]
+    return elapsed, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=["text", "scanned"])
+    parser.add_argument("--pages", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--max-size-mb", type=float, default=5.0)
+    parser.add_argument("--corpus-dir", default=DEFAULT_DIR)
+    args = parser.parse_args()
+
+    print(f"{'kind':<10}{'pages':>6}  {'operation':<12}{'backend':<8}{'seconds':>9}{'parts':>7}"
+          f"{'output MB':>11}  identical")
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in args.kinds:
+            for pages in args.pages:
+                pdf_path = corpus_path(kind, pages, directory=args.corpus_dir)
+                for operation in ("slice_pages", "slice_size"):
+                    for backend in ("pypdf2", "fitz"):
+                        output_dir = os.path.join(tmp, f"{kind}_{pages}_{operation}_{backend}")
+                        os.makedirs(output_dir)
+                        elapsed, sizes = run(pdf_path, output_dir, operation, backend, args.max_size_mb)
+                        print(f"{kind:<10}{pages:>6}  {operation:<12}{backend:<8}{elapsed:>9.2f}{len(sizes):>7}"
+                              f"{sum(sizes) / 1024 / 1024:>11.2f}  {pages_identical(pdf_path, output_dir)}")
+
+
+if __name__ == "__main__":
+    main()
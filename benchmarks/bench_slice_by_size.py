@@ -0,0 +1,85 @@
+"""Benchmark slice_by_size: part sizes stay under the limit and runtime grows linearly.
+
+Usage: python benchmarks/bench_slice_by_size.py [--pages 100 200 400 800] [--max-size-mb 2] [--exact] [--planned]
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from pdf_engine import PDFEngine, ProcessingOptions  # noqa: E402
+
+
+def make_pdf(path, pages, seed=0):
+    """Text pages with a shared logo on each page and a unique noisy scan on every 4th page"""
+    rng = np.random.default_rng(seed)
+    buffer = io.BytesIO()
+    Image.fromarray((rng.random((120, 240, 3)) * 255).astype("uint8")).save(buffer, "PNG")
+    logo = buffer.getvalue()
+
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i + 1} " + "lorem ipsum dolor sit amet " * 8)
+        page.insert_image(fitz.Rect(72, 100, 312, 220), stream=logo)
+        if i % 4 == 0:
+            buffer = io.BytesIO()
+            Image.fromarray((rng.random((300, 300)) * 255).astype("uint8")).save(buffer, "JPEG")
+            page.insert_image(fitz.Rect(72, 240, 372, 540), stream=buffer.getvalue())
+    doc.save(path)
+    doc.close()
+
+
+# mode -> extra ProcessingOptions
+MODES = {
+    "incremental": {},
+    "exact": {"size_accounting": "exact"},
+    "planned": {"plan_parts": True, "slice_workers": os.cpu_count() or 1},
+    "balanced": {"balance_parts": True, "slice_workers": os.cpu_count() or 1},
+}
+
+
+def run(pdf_path, output_dir, max_size_mb, mode):
+    options = ProcessingOptions(pdf_path=pdf_path, output_dir=output_dir, operation="slice_size",
+                                max_size_mb=max_size_mb, **MODES[mode])
+    started = time.perf_counter()
+    PDFEngine(options).run()
+    elapsed = time.perf_counter() - started
+    sizes = [os.path.getsize(os.path.join(output_dir, name))
+             for name in os.listdir(output_dir) if "_part_" in name]
+    return elapsed, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 200, 400, 800])
+    parser.add_argument("--max-size-mb", type=float, default=2.0)
+    parser.add_argument("--exact", action="store_true", help="Also time the old exact mode")
+    parser.add_argument("--planned", action="store_true",
+                        help="Also time planned and balanced parts written by one process per core")
+    args = parser.parse_args()
+
+    modes = ["incremental"] + ["exact"] * args.exact + ["planned", "balanced"] * args.planned
+    limit = args.max_size_mb * 1024 * 1024
+    print(f"{'mode':<12}{'pages':>7}{'seconds':>10}{'ms/page':>9}{'parts':>7}{'largest MB':>12}{'smallest MB':>13}  under limit")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            pdf_path = os.path.join(tmp, f"bench_{pages}.pdf")
+            make_pdf(pdf_path, pages)
+            for mode in modes:
+                output_dir = os.path.join(tmp, f"out_{pages}_{mode}")
+                os.makedirs(output_dir)
+                elapsed, sizes = run(pdf_path, output_dir, args.max_size_mb, mode)
+                print(f"{mode:<12}{pages:>7}{elapsed:>10.2f}{elapsed / pages * 1000:>9.2f}{len(sizes):>7}"
+                      f"{max(sizes) / 1024 / 1024:>12.2f}{min(sizes) / 1024 / 1024:>13.2f}  {all(size <= limit for size in sizes)}")
+
+
+if __name__ == "__main__":
+    main()
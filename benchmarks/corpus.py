@@ -0,0 +1,129 @@
+"""Deterministic synthetic PDF corpus for benchmarks.
+
+Every document is generated locally from a fixed seed, so two machines (or two runs)
+benchmark exactly the same bytes. Generated files are cached by kind, page count and seed.
+
+Usage: python benchmarks/corpus.py --kinds text scanned --pages 10 100 [--dir DIR]
+"""
+import argparse
+import io
+import os
+import sys
+
+import fitz  # PyMuPDF
+import numpy as np
+from PIL import Image, ImageDraw
+
+KINDS = ("text", "scanned", "mixed", "small_images", "logos")
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".corpus")
+CORPUS_VERSION = 1  # bump when generation changes so cached files are rebuilt
+
+WORDS = ("invoice total amount payable account number reference period balance statement "
+         "customer service delivery address quantity description unit price tax subtotal "
+         "report summary section figure table analysis result conclusion appendix").split()
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS, size=words)).capitalize() + "."
+
+
+def _png(img):
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _jpeg(img, quality=75):
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def _scan_image(rng, page_num, width=1240, height=1754):
+    """A 150 dpi A4 'scan': dark text lines on a slightly noisy background"""
+    noise = rng.normal(245, 6, size=(height, width)).clip(0, 255).astype("uint8")
+    img = Image.fromarray(noise, "L")
+    draw = ImageDraw.Draw(img)
+    draw.text((90, 80), f"SCANNED PAGE {page_num + 1}", fill=0)
+    for line in range(40):
+        draw.text((90, 130 + line * 38), _sentence(rng, 10), fill=20)
+    return img
+
+
+def _text_image(rng, width, height):
+    img = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    for line in range(max(1, height // 20)):
+        draw.text((6, 4 + line * 20), _sentence(rng, 4), fill=0)
+    return img
+
+
+def _add_text(page, rng, lines=40):
+    y = 60
+    for _ in range(lines):
+        page.insert_text((50, y), _sentence(rng), fontsize=9)
+        y += 18
+
+
+def build_document(kind, pages, seed=0):
+    """Return a fitz.Document of the given kind and page count"""
+    if kind not in KINDS:
+        raise ValueError(f"Unknown corpus kind: {kind}")
+    rng = np.random.default_rng(seed)
+    doc = fitz.open()
+    logo = _png(_text_image(rng, 320, 90))
+    letterhead = _png(Image.fromarray((rng.random((60, 500, 3)) * 255).astype("uint8")))
+
+    for page_num in range(pages):
+        page = doc.new_page()  # A4
+        if kind == "text":
+            _add_text(page, rng)
+        elif kind == "scanned":
+            page.insert_image(page.rect, stream=_jpeg(_scan_image(rng, page_num)))
+        elif kind == "mixed":
+            if page_num % 3 == 2:
+                page.insert_image(page.rect, stream=_jpeg(_scan_image(rng, page_num)))
+            else:
+                _add_text(page, rng, lines=25)
+                photo = Image.fromarray((rng.random((300, 400, 3)) * 255).astype("uint8"))
+                page.insert_image(fitz.Rect(50, 520, 350, 745), stream=_jpeg(photo))
+        elif kind == "small_images":
+            _add_text(page, rng, lines=5)
+            for i in range(12):
+                x, y = 50 + (i % 3) * 170, 180 + (i // 3) * 150
+                page.insert_image(fitz.Rect(x, y, x + 150, y + 120),
+                                  stream=_png(_text_image(rng, 180, 140)))
+        elif kind == "logos":
+            page.insert_image(fitz.Rect(50, 20, 545, 80), stream=letterhead)
+            page.insert_image(fitz.Rect(400, 90, 545, 130), stream=logo)
+            _add_text(page, rng, lines=30)
+    return doc
+
+
+def corpus_path(kind, pages, seed=0, directory=DEFAULT_DIR):
+    """Path of the cached corpus file, generating it on first use"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{kind}_{pages}p_s{seed}_v{CORPUS_VERSION}.pdf")
+    if not os.path.exists(path):
+        doc = build_document(kind, pages, seed)
+        doc.save(path + ".tmp", garbage=3, deflate=True)
+        doc.close()
+        os.replace(path + ".tmp", path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dir", default=DEFAULT_DIR)
+    args = parser.parse_args()
+    for kind in args.kinds:
+        for pages in args.pages:
+            path = corpus_path(kind, pages, args.seed, args.dir)
+            print(f"{path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB)", file=sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
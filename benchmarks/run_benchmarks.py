@@ -0,0 +1,164 @@
+"""Run the five PDF operations headlessly over the synthetic corpus and report throughput as JSON.
+
+Each (document, operation) pair runs in a fresh subprocess so peak RSS is measured per run.
+Compare two runs with --compare.
+
+Usage:
+    python benchmarks/run_benchmarks.py --kinds text scanned --pages 10 100 --output results.json
+    python benchmarks/run_benchmarks.py --pages 10 --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+OPERATIONS = ("slice_pages", "slice_size", "simple_text_extraction", "to_text", "extract_ocr")
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux; children covers OCR worker processes
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+def _bytes_written(directory):
+    total = 0
+    for root, _, files in os.walk(directory):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def run_single(pdf_path, operation, options_json):
+    """Run one operation in this process and return its measurements"""
+    import fitz  # PyMuPDF
+    from pdf_engine import PDFEngine, ProcessingOptions
+
+    with fitz.open(pdf_path) as doc:
+        pages = len(doc)
+        images = sum(len(page.get_images()) for page in doc)
+
+    errors = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        options = ProcessingOptions(pdf_path=pdf_path, output_dir=output_dir, operation=operation,
+                                    **json.loads(options_json))
+        engine = PDFEngine(options, log_callback=lambda message, tag: errors.append(message)
+                           if tag == 'error' else None)
+        started = time.perf_counter()
+        engine.run()
+        seconds = time.perf_counter() - started
+        written = _bytes_written(output_dir)
+
+    return {
+        "pages": pages,
+        "images": images,
+        "seconds": round(seconds, 4),
+        "pages_per_sec": round(pages / seconds, 2) if seconds else None,
+        "images_per_sec": round(images / seconds, 2) if seconds and images else None,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "bytes_written": written,
+        "errors": errors,
+    }
+
+
+def _tesseract_version():
+    try:
+        import pytesseract
+        return str(pytesseract.get_tesseract_version())
+    except Exception:
+        return None
+
+
+def run_suite(args):
+    from corpus import corpus_path
+
+    options = {"max_size_mb": args.max_size_mb, "enable_ocr": not args.no_ocr,
+               "ocr_workers": args.ocr_workers}
+    results = []
+    for kind in args.kinds:
+        for pages in args.pages:
+            pdf_path = corpus_path(kind, pages, args.seed, args.corpus_dir)
+            for operation in args.operations:
+                completed = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--single", pdf_path, operation,
+                     json.dumps(options)],
+                    capture_output=True, text=True,
+                )
+                row = {"kind": kind, "pages": pages, "operation": operation}
+                try:
+                    row.update(json.loads(completed.stdout.strip().splitlines()[-1]))
+                except (IndexError, ValueError):
+                    row["errors"] = [completed.stderr.strip()[-500:]]
+                results.append(row)
+                print(f"{kind:<13}{pages:>6}  {operation:<23}{row.get('seconds', float('nan')):>9.2f}s"
+                      f"{row.get('pages_per_sec') or 0:>10.1f} p/s{row.get('peak_rss_mb', 0):>9.1f} MB"
+                      f"{'  ERRORS' if row.get('errors') else ''}", file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "tesseract": _tesseract_version(),
+            "seed": args.seed,
+            "options": options,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline_path):
+    """Print pages/sec ratios against a previous results file"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["kind"], r["pages"], r["operation"]): r for r in json.load(f)["results"]}
+    print(f"{'kind':<13}{'pages':>6}  {'operation':<23}{'before p/s':>11}{'after p/s':>11}{'speedup':>9}")
+    for row in current["results"]:
+        old = baseline.get((row["kind"], row["pages"], row["operation"]))
+        if not old or not old.get("pages_per_sec") or not row.get("pages_per_sec"):
+            continue
+        print(f"{row['kind']:<13}{row['pages']:>6}  {row['operation']:<23}{old['pages_per_sec']:>11.1f}"
+              f"{row['pages_per_sec']:>11.1f}{row['pages_per_sec'] / old['pages_per_sec']:>8.2f}x")
+
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "--single":
+        print(json.dumps(run_single(*sys.argv[2:])))
+        return
+
+    from corpus import DEFAULT_DIR, KINDS
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus-dir", default=DEFAULT_DIR)
+    parser.add_argument("--max-size-mb", type=float, default=1.0)
+    parser.add_argument("--ocr-workers", type=int, default=1)
+    parser.add_argument("--no-ocr", action="store_true", help="Benchmark without Tesseract")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="Previous JSON report to compare against")
+    args = parser.parse_args()
+
+    report = run_suite(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
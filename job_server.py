@@ -0,0 +1,527 @@
+"""Local job server: submit PDF jobs over HTTP (localhost or a Unix socket) and poll their progress.
+
+Jobs run on a shared pool of long-lived worker processes, so imports and open documents
+stay warm from one job to the next.
+
+    POST /jobs               {"pdf_path": ..., "output_dir": ..., "operation": ..., "options": {...}}
+    GET  /jobs               every job
+    GET  /jobs/<id>          state, status text, progress, result paths and recent log lines
+    POST /jobs/<id>/cancel   stop a queued or running job
+    GET  /health             pool size and job counts
+
+Usage:
+    python main.py --serve --port 8765 --workers 4
+    python job_server.py submit input.pdf -o out/ --operation extract_ocr --wait
+    python job_server.py status <id>
+"""
+import argparse
+import collections
+import concurrent.futures
+import http.client
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.managers import SyncManager
+from typing import Optional, get_args, get_type_hints
+
+from pdf_engine import OCR_BACKENDS, OPERATIONS, PDFEngine, ProcessingOptions, use_ocr_backend
+
+DEFAULT_PORT = 8765
+# Set by the server for all of its warm workers, so a job cannot choose its own
+SERVER_OPTIONS = {"pdf_path", "output_dir", "operation", "ocr_backend"}
+
+
+@dataclass
+class JobOutcome:
+    """What a worker process reports back when a job ends"""
+    state: str  # "completed", "failed" or "stopped"
+    seconds: float = 0.0
+    message: str = ""
+    outputs: list = field(default_factory=list)
+
+
+def _check_option(name, value, kind):
+    """Raise ValueError unless a JSON value fits a ProcessingOptions field; returns it as that type"""
+    optional = type(None) in get_args(kind)
+    if optional:
+        kind = next(arg for arg in get_args(kind) if arg is not type(None))
+        if value is None:
+            return None
+    if kind is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, kind) and not (kind is int and isinstance(value, bool)):
+        return value
+    expected = kind.__name__ + (" or null" if optional else "")
+    raise ValueError(f"Option {name} must be {expected}, got {json.dumps(value)}")
+
+
+def _ignore_interrupts():
+    # Ctrl+C reaches the whole process group; only the server reacts, by cancelling its jobs
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _init_server_worker(ocr_backend):
+    _ignore_interrupts()
+    use_ocr_backend(ocr_backend)  # selected once per worker, reused by every job it runs
+
+
+def _run_server_job(job_id, options, stop_event, events):
+    """Run one job inside a pool process, streaming status and log lines to the server"""
+    if stop_event.is_set():
+        return JobOutcome("stopped")  # cancelled after the pool had already taken it off the queue
+    started = time.perf_counter()
+    errors = []
+    events.put((job_id, "started", None))
+
+    def forward_log(message, tag):
+        if tag == 'error':
+            errors.append(message.removeprefix("❌ "))
+        events.put((job_id, "log", (message, tag)))
+
+    def forward_status(status, progress):
+        events.put((job_id, "status", (status, progress)))
+
+    engine = PDFEngine(options, log_callback=forward_log, status_callback=forward_status)
+    finished = threading.Event()
+
+    def forward_stop():
+        while not finished.is_set():
+            if stop_event.wait(0.2):
+                engine.stop()
+                return
+
+    threading.Thread(target=forward_stop, daemon=True).start()
+    try:
+        completed = engine.run()
+    except Exception as e:
+        errors.append(str(e))
+        completed = False
+    finally:
+        finished.set()
+
+    seconds = time.perf_counter() - started
+    outputs = list(engine.outputs)
+    if errors:
+        return JobOutcome("failed", seconds, errors[0], outputs)
+    return JobOutcome("completed" if completed else "stopped", seconds, outputs=outputs)
+
+
+@dataclass
+class Job:
+    """One submitted job as the server tracks it"""
+    id: str
+    options: ProcessingOptions
+    state: str = "queued"  # "queued", "running", "completed", "failed" or "stopped"
+    status: str = ""
+    progress: Optional[float] = None
+    submitted: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    message: str = ""
+    outputs: list = field(default_factory=list)
+    log: collections.deque = field(default_factory=lambda: collections.deque(maxlen=JobServer.LOG_TAIL))
+    stop_event: object = None
+    future: Optional[concurrent.futures.Future] = None
+
+    @property
+    def done(self):
+        return self.state in ("completed", "failed", "stopped")
+
+    def to_dict(self, log_lines=20):
+        return {
+            "id": self.id,
+            "operation": self.options.operation,
+            "pdf_path": self.options.pdf_path,
+            "output_dir": self.options.output_dir,
+            "state": self.state,
+            "status": self.status,
+            "progress": self.progress,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+            "message": self.message,
+            "outputs": self.outputs,
+            "log": list(self.log)[-log_lines:] if log_lines else [],
+        }
+
+
+class JobServer:
+    """Queues PDF jobs onto a shared pool of worker processes that live as long as the server"""
+
+    LOG_TAIL = 200  # log lines kept per job
+
+    def __init__(self, workers=1, ocr_backend="auto", log_callback=None):
+        self.workers = workers or os.cpu_count() or 1
+        # Every job uses the same backend: a worker keeps one loaded for all the jobs it runs
+        self.ocr_backend = use_ocr_backend(ocr_backend).name  # fails fast when an explicit backend is missing
+        self.log_callback = log_callback
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._manager = SyncManager()
+        self._manager.start(_ignore_interrupts)
+        self._events = self._manager.Queue()
+        self._closed = threading.Event()
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_server_worker, initargs=(self.ocr_backend,)
+        )
+        self._pump = threading.Thread(target=self._pump_events, daemon=True, name="job-events")
+        self._pump.start()
+
+    def log(self, message, tag='info'):
+        if self.log_callback:
+            self.log_callback(message, tag)
+
+    def submit(self, request):
+        """Queue a job from a request dict; raises ValueError when it is invalid"""
+        options = self.build_options(request)
+        job = Job(uuid.uuid4().hex[:12], options, stop_event=self._manager.Event())
+        with self._lock:
+            self.jobs[job.id] = job
+        job.future = self._executor.submit(_run_server_job, job.id, options, job.stop_event, self._events)
+        job.future.add_done_callback(lambda future: self._finish(job, future))
+        self.log(f"📥 Job {job.id} queued: {options.operation} {os.path.basename(options.pdf_path)}", 'info')
+        return job
+
+    def build_options(self, request):
+        if not isinstance(request, dict):
+            raise ValueError("Request body must be a JSON object")
+        pdf_path = request.get("pdf_path")
+        output_dir = request.get("output_dir")
+        operation = request.get("operation", "slice_pages")
+        if not pdf_path or not os.path.isfile(pdf_path):
+            raise ValueError(f"PDF file not found: {pdf_path}")
+        if not output_dir or not os.path.isdir(output_dir):
+            raise ValueError(f"Output directory does not exist: {output_dir}")
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {operation}")
+        extra = request.get("options") or {}
+        if not isinstance(extra, dict):
+            raise ValueError("options must be a JSON object")
+        if "ocr_backend" in extra:
+            raise ValueError("ocr_backend is chosen by the server (serve --ocr-backend), not per job")
+        kinds = get_type_hints(ProcessingOptions)
+        unknown = set(extra) - (set(kinds) - SERVER_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown options: {', '.join(sorted(unknown))}")
+        extra = {name: _check_option(name, value, kinds[name]) for name, value in extra.items()}
+        extra["ocr_backend"] = self.ocr_backend
+        return ProcessingOptions(pdf_path=os.path.abspath(pdf_path), output_dir=os.path.abspath(output_dir),
+                                 operation=operation, **extra)
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id):
+        """Stop a job: a queued one never starts, a running one stops like the GUI's Stop button"""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return job
+        job.stop_event.set()
+        if job.future.cancel():
+            self._set_outcome(job, JobOutcome("stopped"))
+        self.log(f"⏹️ Job {job.id}: cancel requested", 'warning')
+        return job
+
+    def health(self):
+        counts = collections.Counter(job.state for job in self.list())
+        return {"workers": self.workers, "ocr_backend": self.ocr_backend,
+                "jobs": {state: counts.get(state, 0)
+                         for state in ("queued", "running", "completed", "failed", "stopped")}}
+
+    def shutdown(self):
+        for job in self.list():
+            if not job.done:
+                self.cancel(job.id)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._closed.set()
+        self._pump.join()
+        self._manager.shutdown()
+
+    def _pump_events(self):
+        """Apply status and log events from the workers to their jobs"""
+        while not self._closed.is_set():
+            try:
+                job_id, kind, payload = self._events.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            job = self.get(job_id)
+            if job is None:
+                continue
+            with self._lock:
+                if kind == "started":
+                    if job.state == "queued":
+                        job.state = "running"
+                    job.started = job.started or time.time()
+                elif kind == "status":
+                    job.status, progress = payload
+                    if progress is not None:
+                        job.progress = progress
+                elif kind == "log":
+                    message, tag = payload
+                    job.log.append(f"[{time.strftime('%H:%M:%S')}] {message}")
+
+    def _finish(self, job, future):
+        if future.cancelled():
+            outcome = JobOutcome("stopped")
+        else:
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = JobOutcome("failed", message=str(e))
+        self._set_outcome(job, outcome)
+
+    def _set_outcome(self, job, outcome):
+        with self._lock:
+            if job.done:
+                return
+            job.state = outcome.state
+            job.message = outcome.message
+            job.outputs = outcome.outputs
+            job.finished = time.time()
+            if outcome.state == "completed":
+                job.progress = 100
+        if outcome.state == "completed":
+            self.log(f"✅ Job {job.id}: completed in {outcome.seconds:.1f}s, {len(outcome.outputs)} files", 'success')
+        elif outcome.state == "failed":
+            self.log(f"❌ Job {job.id}: {outcome.message}", 'error')
+        else:
+            self.log(f"⏹️ Job {job.id}: stopped", 'warning')
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over a JobServer (self.server.jobs)"""
+
+    server_version = "PDFProcessorJobServer/1.0"
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        if parts == ["health"]:
+            return self._reply(200, self.server.jobs.health())
+        if parts == ["jobs"]:
+            return self._reply(200, {"jobs": [job.to_dict(log_lines=0) for job in self.server.jobs.list()]})
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.server.jobs.get(parts[1])
+            if job is None:
+                return self._reply(404, {"error": f"No job {parts[1]}"})
+            return self._reply(200, job.to_dict())
+        self._reply(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        parts = self.path.strip("/").split("/")
+        if parts == ["jobs"]:
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                job = self.server.jobs.submit(json.loads(self.rfile.read(length) or b"{}"))
+            except (ValueError, TypeError) as e:
+                return self._reply(400, {"error": str(e)})
+            return self._reply(202, job.to_dict(log_lines=0))
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+            job = self.server.jobs.cancel(parts[1])
+            if job is None:
+                return self._reply(404, {"error": f"No job {parts[1]}"})
+            return self._reply(202, job.to_dict(log_lines=0))
+        self._reply(404, {"error": f"Unknown path {self.path}"})
+
+    def _reply(self, code, body):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "local"
+
+    def log_message(self, format, *args):
+        pass  # job lifecycle is logged by the JobServer instead
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_http_server(jobs, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None):
+    """HTTP server for jobs on host:port, or on a Unix socket when socket_path is given"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, JobRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), JobRequestHandler)
+        server.daemon_threads = True
+    server.jobs = jobs
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=30):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class JobClient:
+    """Minimal client for the job server API"""
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, socket_path=None, timeout=30):
+        self.host, self.port, self.socket_path, self.timeout = host, port, socket_path, timeout
+
+    def _request(self, method, path, body=None):
+        if self.socket_path:
+            connection = _UnixHTTPConnection(self.socket_path, self.timeout)
+        else:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            data = json.dumps(body).encode() if body is not None else None
+            connection.request(method, path, body=data, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            result = json.loads(response.read() or b"{}")
+        finally:
+            connection.close()
+        if response.status >= 400:
+            raise RuntimeError(result.get("error", f"HTTP {response.status}"))
+        return result
+
+    def submit(self, pdf_path, output_dir, operation="slice_pages", **options):
+        return self._request("POST", "/jobs", {"pdf_path": os.path.abspath(pdf_path),
+                                               "output_dir": os.path.abspath(output_dir),
+                                               "operation": operation, "options": options})
+
+    def status(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def jobs(self):
+        return self._request("GET", "/jobs")["jobs"]
+
+    def cancel(self, job_id):
+        return self._request("POST", f"/jobs/{job_id}/cancel")
+
+    def health(self):
+        return self._request("GET", "/health")
+
+    def wait(self, job_id, poll_interval=0.5, progress_callback=None):
+        """Poll until the job ends; returns its final status"""
+        while True:
+            job = self.status(job_id)
+            if progress_callback:
+                progress_callback(job)
+            if job["state"] in ("completed", "failed", "stopped"):
+                return job
+            time.sleep(poll_interval)
+
+
+def build_arg_parser():
+    address = argparse.ArgumentParser(add_help=False)
+    address.add_argument("--host", default="127.0.0.1")
+    address.add_argument("--port", type=int, default=DEFAULT_PORT)
+    address.add_argument("--socket", dest="socket_path", help="Use a Unix socket instead of TCP")
+
+    parser = argparse.ArgumentParser(description="PDF Processor Pro job server and client")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", parents=[address], help="Run the server until interrupted")
+    serve.add_argument("--workers", type=int, default=1, help="Worker processes (0 = one per CPU core)")
+    serve.add_argument("--ocr-backend", choices=["auto", *OCR_BACKENDS], default="auto",
+                       help="OCR engine; auto takes the first available")
+
+    submit = commands.add_parser("submit", parents=[address], help="Queue a job")
+    submit.add_argument("pdf_path")
+    submit.add_argument("-o", "--output-dir", default=".")
+    submit.add_argument("--operation", choices=list(OPERATIONS), default="slice_pages")
+    submit.add_argument("--options", default="{}", help='ProcessingOptions fields as JSON, e.g. \'{"max_size_mb": 2}\'')
+    submit.add_argument("--wait", action="store_true", help="Print progress until the job ends")
+
+    status = commands.add_parser("status", parents=[address], help="Show one job, or all jobs")
+    status.add_argument("job_id", nargs="?")
+
+    cancel = commands.add_parser("cancel", parents=[address], help="Stop a job")
+    cancel.add_argument("job_id")
+    return parser
+
+
+def _print_log(message, tag='info'):
+    stream = sys.stderr if tag in ('warning', 'error') else sys.stdout
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", file=stream, flush=True)
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(args):
+    signal.signal(signal.SIGTERM, _interrupt)  # service managers stop the server like Ctrl+C
+    jobs = JobServer(args.workers, args.ocr_backend, log_callback=_print_log)
+    server = make_http_server(jobs, args.host, args.port, args.socket_path)
+    where = args.socket_path or f"http://{args.host}:{args.port}"
+    _print_log(f"🛰️ Job server on {where}: {jobs.workers} workers, OCR backend {jobs.ocr_backend}")
+    try:
+        server.serve_forever(poll_interval=0.2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # A second Ctrl+C must not abandon workers half-way through their cleanup
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        _print_log("🛑 Shutting down: stopping running jobs...", 'warning')
+        server.server_close()
+        jobs.shutdown()
+        if args.socket_path and os.path.exists(args.socket_path):
+            os.unlink(args.socket_path)
+    return 0
+
+
+def cli_main(argv=None):
+    """Job server / client entry point; returns a process exit code"""
+    args = build_arg_parser().parse_args(argv)
+    if args.command == "serve":
+        return serve(args)
+
+    client = JobClient(args.host, args.port, args.socket_path)
+    try:
+        if args.command == "submit":
+            job = client.submit(args.pdf_path, args.output_dir, args.operation, **json.loads(args.options))
+            print(job["id"])
+            if not args.wait:
+                return 0
+            job = client.wait(job["id"], progress_callback=lambda job: print(
+                f"{job['state']:<10}{job['progress'] or 0:>6.0f}%  {job['status']}", file=sys.stderr))
+            for path in job["outputs"]:
+                print(path)
+            if job["message"]:
+                print(f"❌ {job['message']}", file=sys.stderr)
+            return {"completed": 0, "failed": 1}.get(job["state"], 130)
+        if args.command == "status":
+            print(json.dumps(client.status(args.job_id) if args.job_id else client.jobs(), indent=2))
+            return 0
+        if args.command == "cancel":
+            print(json.dumps(client.cancel(args.job_id), indent=2))
+            return 0
+    except (OSError, RuntimeError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(cli_main())
@@ -1,17 +1,26 @@
+import sys
+
+if __name__ == "__main__" and "--cli" in sys.argv[1:]:
+    # Headless mode: run the engine without loading Tk at all
+    from pdf_engine import cli_main
+    sys.exit(cli_main([arg for arg in sys.argv[1:] if arg != "--cli"]))
+
+if __name__ == "__main__" and "--serve" in sys.argv[1:]:
+    # Job server mode: accept jobs from local clients instead of showing the GUI
+    from job_server import cli_main
+    sys.exit(cli_main(["serve"] + [arg for arg in sys.argv[1:] if arg != "--serve"]))
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
-import PyPDF2
-import fitz  # PyMuPDF
-from PIL import Image, ImageEnhance, ImageStat
 import pytesseract
 import os
-import io
 from pathlib import Path
 import threading
+import queue
 import time
 import webbrowser
-import uuid
-import numpy as np
+from pdf_engine import (BatchRunner, PDFEngine, ProcessingOptions, collect_batch_inputs, is_batch_source,
+                        read_document_info)
 
 class ModernStyle:
     def __init__(self, root):
@@ -41,125 +50,11 @@ class ModernStyle:
         style.configure('Modern.TNotebook', tabposition='n')
         style.configure('Modern.TNotebook.Tab', padding=[10, 5], font=('Segoe UI', 9))
 
-class ImageQualityFilter:
-    """Class to filter and assess image quality for OCR processing"""
-    
-    @staticmethod
-    def is_meaningful_image(pix, img_pil=None, min_size=100, max_aspect_ratio=10):
-        """Check if image is meaningful for OCR processing"""
-        try:
-            # Size check - increased minimum size
-            if pix.width < min_size or pix.height < min_size:
-                return False, f"Too small ({pix.width}x{pix.height})"
-            
-            # Aspect ratio check - avoid very thin/wide images (likely decorative lines)
-            aspect_ratio = max(pix.width, pix.height) / min(pix.width, pix.height)
-            if aspect_ratio > max_aspect_ratio:
-                return False, f"Extreme aspect ratio ({aspect_ratio:.1f}:1)"
-            
-            # Area check - minimum area threshold
-            area = pix.width * pix.height
-            if area < min_size * min_size:
-                return False, f"Insufficient area ({area} pixels)"
-            
-            # Convert to PIL Image if not provided
-            if img_pil is None:
-                img_data = pix.tobytes("png")
-                img_pil = Image.open(io.BytesIO(img_data))
-            
-            # Complexity check - avoid solid color images
-            if not ImageQualityFilter._has_sufficient_complexity(img_pil):
-                return False, "Low complexity (solid/gradient)"
-            
-            # Variance check - ensure image has enough detail
-            if not ImageQualityFilter._has_sufficient_variance(img_pil):
-                return False, "Low variance (uniform content)"
-            
-            return True, "Passed all checks"
-            
-        except Exception as e:
-            return False, f"Error in quality check: {e}"
-    
-    @staticmethod
-    def _has_sufficient_complexity(img, min_unique_colors=10):
-        """Check if image has sufficient color complexity"""
-        try:
-            # Convert to grayscale for analysis
-            gray_img = img.convert('L')
-            
-            # Resize to reduce computation if image is very large
-            if gray_img.width * gray_img.height > 250000:  # ~500x500
-                gray_img.thumbnail((500, 500), Image.Resampling.LANCZOS)
-            
-            # Count unique colors
-            colors = gray_img.getcolors(maxcolors=256*256)
-            if not colors:
-                return True  # Too many colors, likely complex
-            
-            unique_colors = len(colors)
-            return unique_colors >= min_unique_colors
-            
-        except Exception:
-            return True  # Default to True if analysis fails
-    
-    @staticmethod
-    def _has_sufficient_variance(img, min_std=15):
-        """Check if image has sufficient statistical variance"""
-        try:
-            # Convert to grayscale
-            gray_img = img.convert('L')
-            
-            # Resize for faster computation
-            if gray_img.width * gray_img.height > 250000:
-                gray_img.thumbnail((500, 500), Image.Resampling.LANCZOS)
-            
-            # Calculate standard deviation
-            stat = ImageStat.Stat(gray_img)
-            std_dev = stat.stddev[0] if isinstance(stat.stddev, list) else stat.stddev
-            
-            return std_dev >= min_std
-            
-        except Exception:
-            return True  # Default to True if analysis fails
-    
-    @staticmethod
-    def quick_ocr_test(img, confidence_threshold=30):
-        """Perform a quick OCR test to check if image likely contains text"""
-        try:
-            # Resize image for faster OCR test
-            test_img = img.copy()
-            if test_img.width > 800 or test_img.height > 800:
-                test_img.thumbnail((800, 800), Image.Resampling.LANCZOS)
-            
-            # Quick OCR with confidence data
-            try:
-                data = pytesseract.image_to_data(test_img, output_type=pytesseract.Output.DICT, config='--psm 6')
-                confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
-                
-                if not confidences:
-                    return False, "No text detected"
-                
-                avg_confidence = sum(confidences) / len(confidences)
-                detected_text = ' '.join([data['text'][i] for i in range(len(data['text'])) 
-                                        if int(data['conf'][i]) > confidence_threshold])
-                
-                if avg_confidence >= confidence_threshold and len(detected_text.strip()) > 3:
-                    return True, f"Text detected (confidence: {avg_confidence:.1f}%)"
-                else:
-                    return False, f"Low confidence text ({avg_confidence:.1f}%)"
-                    
-            except Exception as e:
-                # Fallback to simple text extraction
-                text = pytesseract.image_to_string(test_img, config='--psm 6')
-                if len(text.strip()) > 3:
-                    return True, "Text detected (fallback method)"
-                else:
-                    return False, "No meaningful text detected"
-                    
-        except Exception as e:
-            return False, f"OCR test failed: {e}"
-
 class PDFProcessor:
+    # Worker threads only queue events; the Tk thread applies them in batches
+    EVENT_POLL_MS = 100
+    MAX_EVENTS_PER_POLL = 5000
+
     def __init__(self, root):
         self.root = root
         self.root.title("PDF Processor Pro")
@@ -168,7 +63,6 @@ class PDFProcessor:
         self.root.configure(bg='#FAFAFA')
         
         self.style = ModernStyle(root)
-        self.image_filter = ImageQualityFilter()
         
         # Variables
         self.pdf_path = tk.StringVar()
@@ -185,8 +79,11 @@ class PDFProcessor:
         self.is_processing = False
         self.stop_processing = False
         self.current_thread = None
+        self.engine = None
+        self.events = queue.Queue()
         
         self.setup_ui()
+        self.root.after(self.EVENT_POLL_MS, self.process_events)
         
     def setup_ui(self):
         main_container = tk.Frame(self.root, bg='#FAFAFA')
@@ -256,6 +153,11 @@ class PDFProcessor:
             bg='#2196F3', fg='white', font=('Segoe UI', 8),
             relief=tk.FLAT, padx=6, pady=1, cursor='hand2'
         ).pack(side=tk.RIGHT)
+        tk.Button(
+            pdf_frame, text="🗂️", command=self.browse_pdf_folder,
+            bg='#2196F3', fg='white', font=('Segoe UI', 8),
+            relief=tk.FLAT, padx=6, pady=1, cursor='hand2'
+        ).pack(side=tk.RIGHT, padx=(0, 2))
         self.pdf_info_label = ttk.Label(file_tab, text="No PDF selected", style='Body.TLabel')
         self.pdf_info_label.grid(row=2, column=0, columnspan=2, sticky='w', pady=(2, 5))
         
@@ -407,42 +309,100 @@ class PDFProcessor:
             self.pdf_path.set(filename)
             self.update_page_info()
     
+    def browse_pdf_folder(self):
+        directory = filedialog.askdirectory()
+        if directory:
+            self.pdf_path.set(directory)
+            self.update_page_info()
+
     def browse_output(self):
         directory = filedialog.askdirectory()
         if directory:
             self.output_dir.set(directory)
     
     def update_page_info(self):
+        path = self.pdf_path.get()
+        if not path:
+            return
+        # Opening the document happens off the Tk thread; the result comes back as a 'pdf_info' event
+        self.pdf_info_label.config(text="⏳ Reading PDF...")
+        threading.Thread(target=self._load_page_info, args=(path,), daemon=True).start()
+
+    def _load_page_info(self, path):
         try:
-            if self.pdf_path.get():
-                with open(self.pdf_path.get(), 'rb') as file:
-                    reader = PyPDF2.PdfReader(file)
-                    total_pages = len(reader.pages)
-                    self.end_page.set(total_pages)
-                    file_size = os.path.getsize(self.pdf_path.get()) / (1024 * 1024)
-                    self.pdf_info_label.config(text=f"✅ {total_pages} pages, {file_size:.1f} MB")
-                    self.log(f"PDF loaded: {total_pages} pages, {file_size:.1f} MB", 'info')
+            if is_batch_source(path):
+                pdf_files = collect_batch_inputs(path)
+                total_size = sum(os.path.getsize(pdf_file) for pdf_file in pdf_files) / (1024 * 1024)
+                self.events.put(('pdf_info', path, f"📦 Batch: {len(pdf_files)} PDFs, {total_size:.1f} MB", None))
+                self.log(f"Batch selected: {len(pdf_files)} PDFs, {total_size:.1f} MB", 'info')
+            else:
+                total_pages, size_mb, metadata = read_document_info(path)
+                self.events.put(('pdf_info', path, f"✅ {total_pages} pages, {size_mb:.1f} MB", total_pages))
+                title = metadata.get('title')
+                self.log(f"PDF loaded: {total_pages} pages, {size_mb:.1f} MB"
+                         + (f" - {title}" if title else ""), 'info')
         except Exception as e:
-            self.pdf_info_label.config(text="❌ Error reading PDF")
+            self.events.put(('pdf_info', path, "❌ Error reading PDF", None))
             self.log(f"Error reading PDF: {e}", 'error')
     
     def log(self, message, tag='info'):
         timestamp = time.strftime("%H:%M:%S")
-        self.output_text.insert(tk.END, f"[{timestamp}] {message}\n", tag)
-        self.output_text.see(tk.END)
-        self.root.update_idletasks()
+        self.events.put(('log', f"[{timestamp}] {message}\n", tag))
     
     def clear_log(self):
         self.output_text.delete(1.0, tk.END)
     
     def update_status(self, status, progress=None):
-        self.status_label.config(text=status)
+        self.events.put(('status', status, progress))
+
+    def process_events(self):
+        """Apply queued log/status events on the Tk thread, coalesced into one update per poll"""
+        log_runs = []  # [texts, tag] runs of consecutive lines sharing a tag
+        status = progress = pdf_info = None
+        finished = False
+        for _ in range(self.MAX_EVENTS_PER_POLL):
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event[0] == 'log':
+                if log_runs and log_runs[-1][1] == event[2]:
+                    log_runs[-1][0].append(event[1])
+                else:
+                    log_runs.append([[event[1]], event[2]])
+            elif event[0] == 'status':
+                status = event[1]
+                if event[2] is not None:
+                    progress = event[2]
+            elif event[0] == 'pdf_info':
+                pdf_info = event
+            elif event[0] == 'finished':
+                finished = True
+
+        for texts, tag in log_runs:
+            self.output_text.insert(tk.END, ''.join(texts), tag)
+        if log_runs:
+            self.output_text.see(tk.END)
+        # Only the latest status per poll reaches the widgets, which caps progress redraws
+        if status is not None:
+            self.status_label.config(text=status)
         if progress is not None:
             self.progress['value'] = progress
-        self.root.update_idletasks()
+        # Ignore info for a file that is no longer selected
+        if pdf_info is not None and pdf_info[1] == self.pdf_path.get():
+            self.pdf_info_label.config(text=pdf_info[2])
+            if pdf_info[3] is not None:
+                self.end_page.set(pdf_info[3])
+        if finished:
+            self.process_btn.config(state=tk.NORMAL)
+            self.stop_btn.config(state=tk.DISABLED)
+
+        self.root.after(self.EVENT_POLL_MS, self.process_events)
     
     def stop_process(self):
         self.stop_processing = True
+        if self.engine:
+            self.engine.stop()
         self.log("⏹️ Stopping...", 'warning')
         self.update_status("Stopping process...")
     
@@ -460,392 +420,37 @@ class PDFProcessor:
         self.current_thread = threading.Thread(target=self._process_pdf_thread, daemon=True)
         self.current_thread.start()
     
+    def build_options(self):
+        return ProcessingOptions(
+            pdf_path=self.pdf_path.get(),
+            output_dir=self.output_dir.get(),
+            operation=self.operation.get(),
+            start_page=self.start_page.get(),
+            end_page=self.end_page.get(),
+            max_size_mb=self.max_size_mb.get(),
+            enable_ocr=self.enable_ocr.get(),
+            extract_images=self.extract_images.get(),
+            smart_filtering=self.smart_filtering.get(),
+            min_image_size=self.min_image_size.get(),
+        )
+
     def _process_pdf_thread(self):
         try:
-            self.update_status("Initializing...", 0)
-            self.log("🚀 Starting...", 'info')
-            operation = self.operation.get()
-            if operation == "slice_pages":
-                self.slice_by_pages()
-            elif operation == "slice_size":
-                self.slice_by_size()
-            elif operation == "to_text":
-                self.convert_to_text()
-            elif operation == "extract_ocr":
-                self.extract_and_ocr()
-            elif operation == "simple_text_extraction":
-                self.simple_convert_to_text()
-            if not self.stop_processing:
-                self.update_status("✅ Completed!", 100)
-                self.log("✅ Completed successfully!", 'success')
+            options = self.build_options()
+            if is_batch_source(options.pdf_path):
+                # Folders and glob patterns run as a batch across all CPU cores
+                self.engine = BatchRunner(options, collect_batch_inputs(options.pdf_path), workers=0,
+                                          log_callback=self.log, status_callback=self.update_status)
             else:
-                self.update_status("⏹️ Stopped", 0)
-                self.log("⏹️ Stopped by user", 'warning')
+                self.engine = PDFEngine(options, log_callback=self.log,
+                                        status_callback=self.update_status)
+            self.engine.run()
         except Exception as e:
             self.log(f"❌ Error: {e}", 'error')
             self.update_status("❌ Error occurred", 0)
         finally:
             self.is_processing = False
-            self.process_btn.config(state=tk.NORMAL)
-            self.stop_btn.config(state=tk.DISABLED)
-
-    def is_image_worth_processing(self, pix, page_num, img_index):
-        """Enhanced image filtering with detailed logging"""
-        if not self.smart_filtering.get():
-            # Basic size check only
-            min_size = self.min_image_size.get()
-            if pix.width < min_size or pix.height < min_size:
-                self.log(f"⏭️ Page {page_num + 1}, Image {img_index + 1}: Too small ({pix.width}x{pix.height})", 'filter')
-                return False
-            return True
-        
-        # Advanced filtering
-        try:
-            img_data = pix.tobytes("png")
-            img_pil = Image.open(io.BytesIO(img_data))
-            
-            # Quality assessment
-            is_worthy, reason = self.image_filter.is_meaningful_image(
-                pix, img_pil, min_size=self.min_image_size.get()
-            )
-            
-            if not is_worthy:
-                self.log(f"⏭️ Page {page_num + 1}, Image {img_index + 1}: {reason}", 'filter')
-                return False
-            
-            # Quick OCR test if OCR is enabled
-            if self.enable_ocr.get():
-                has_text, ocr_reason = self.image_filter.quick_ocr_test(img_pil)
-                if not has_text:
-                    self.log(f"⏭️ Page {page_num + 1}, Image {img_index + 1}: {ocr_reason}", 'filter')
-                    return False
-                else:
-                    self.log(f"✅ Page {page_num + 1}, Image {img_index + 1}: {ocr_reason}", 'info')
-            
-            return True
-            
-        except Exception as e:
-            self.log(f"⚠️ Error filtering image {img_index + 1}: {e}", 'warning')
-            return True  # Default to processing if filtering fails
-
-    def simple_convert_to_text(self):
-        if self.stop_processing:
-            return
-        self.update_status("📝 Extracting text...", 10)
-        self.log("📄 Starting simple text extraction...", 'info')
-        text_content = []
-        try:
-            with open(self.pdf_path.get(), 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                total_pages = len(reader.pages)
-                for i, page in enumerate(reader.pages):
-                    if self.stop_processing:
-                        return
-                    self.update_status(f"Page {i + 1}/{total_pages}...", 10 + (i/total_pages)*80)
-                    text = page.extract_text() or ""
-                    text_content.append(f"--- Page {i + 1} ---\n{text}\n")
-                    self.log(f"✅ Page {i + 1} extracted", 'info')
-        except Exception as e:
-            self.log(f"❌ Error reading PDF: {e}", 'error')
-            return
-        if not self.stop_processing:
-            output_path = os.path.join(self.output_dir.get(), f"{Path(self.pdf_path.get()).stem}_simple_text.txt")
-            try:
-                with open(output_path, 'w', encoding='utf-8') as text_file:
-                    text_file.write('\n'.join(text_content))
-                self.log(f"✅ Saved: {output_path}", 'success')
-            except Exception as e:
-                self.log(f"❌ Error saving: {e}", 'error')
-    
-    def slice_by_pages(self):
-        if self.stop_processing:
-            return
-        self.update_status("📄 Slicing pages...", 25)
-        try:
-            with open(self.pdf_path.get(), 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                start = max(1, self.start_page.get()) - 1
-                end = min(len(reader.pages), self.end_page.get())
-                writer = PyPDF2.PdfWriter()
-                
-                for i in range(start, end):
-                    if self.stop_processing:
-                        return
-                    writer.add_page(reader.pages[i])
-                    self.update_status(f"Page {i+1}...", 25 + (i-start)/(end-start)*50)
-                    self.log(f"✅ Added page {i+1}", 'info')
-                
-                if not self.stop_processing:
-                    output_path = os.path.join(self.output_dir.get(), 
-                                             f"{Path(self.pdf_path.get()).stem}_pages_{start+1}-{end}.pdf")
-                    with open(output_path, 'wb') as output_file:
-                        writer.write(output_file)
-                    self.log(f"✅ Saved: {output_path}", 'success')
-                    self.update_status("✅ Pages sliced successfully!", 100)
-                    
-        except Exception as e:
-            self.log(f"❌ Error slicing pages: {e}", 'error')
-            self.update_status("❌ Error occurred", 0)
-    
-    def slice_by_size(self):
-        if self.stop_processing:
-            return
-        self.update_status("💾 Slicing by size...", 10)
-        self.log("💾 Starting size-based slicing...", 'info')
-        
-        try:
-            max_size_bytes = self.max_size_mb.get() * 1024 * 1024
-            
-            with open(self.pdf_path.get(), 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                total_pages = len(reader.pages)
-                
-                current_writer = PyPDF2.PdfWriter()
-                current_size = 0
-                part_number = 1
-                pages_in_current_part = 0
-                
-                for i, page in enumerate(reader.pages):
-                    if self.stop_processing:
-                        return
-                    
-                    self.update_status(f"Processing page {i+1}/{total_pages}...", 
-                                     10 + (i/total_pages)*80)
-                    
-                    # Add page to current writer
-                    current_writer.add_page(page)
-                    pages_in_current_part += 1
-                    
-                    # Estimate current size
-                    temp_output = io.BytesIO()
-                    current_writer.write(temp_output)
-                    current_size = temp_output.tell()
-                    temp_output.close()
-                    
-                    # Check if we need to save current part
-                    if current_size >= max_size_bytes or i == total_pages - 1:
-                        if not self.stop_processing:
-                            output_path = os.path.join(
-                                self.output_dir.get(),
-                                f"{Path(self.pdf_path.get()).stem}_part_{part_number}.pdf"
-                            )
-                            with open(output_path, 'wb') as output_file:
-                                current_writer.write(output_file)
-                            
-                            self.log(f"✅ Saved part {part_number}: {pages_in_current_part} pages, "
-                                   f"{current_size/1024/1024:.1f} MB", 'success')
-                            
-                            # Reset for next part
-                            current_writer = PyPDF2.PdfWriter()
-                            current_size = 0
-                            part_number += 1
-                            pages_in_current_part = 0
-                
-        except Exception as e:
-            self.log(f"❌ Error slicing by size: {e}", 'error')
-            self.update_status("❌ Error occurred", 0)
-    
-    def convert_to_text(self):
-        if self.stop_processing:
-            return
-        self.update_status("📝 Converting to text with OCR...", 10)
-        self.log("📝 Starting advanced text extraction...", 'info')
-        
-        text_content = []
-        
-        try:
-            doc = fitz.open(self.pdf_path.get())
-            total_pages = len(doc)
-            
-            for page_num in range(total_pages):
-                if self.stop_processing:
-                    return
-                
-                self.update_status(f"Processing page {page_num + 1}/{total_pages}...", 
-                                 10 + (page_num/total_pages)*80)
-                
-                page = doc[page_num]
-                
-                # Extract text using PyMuPDF
-                text = page.get_text()
-                
-                # If OCR is enabled and text is minimal, try OCR
-                if self.enable_ocr.get() and len(text.strip()) < 50:
-                    try:
-                        # Convert page to image
-                        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # Higher resolution
-                        img_data = pix.tobytes("png")
-                        img = Image.open(io.BytesIO(img_data))
-                        
-                        # Perform OCR
-                        ocr_text = pytesseract.image_to_string(img, config='--psm 1')
-                        if len(ocr_text.strip()) > len(text.strip()):
-                            text = ocr_text
-                            self.log(f"📖 OCR applied to page {page_num + 1}", 'info')
-                        
-                    except Exception as ocr_error:
-                        self.log(f"⚠️ OCR failed for page {page_num + 1}: {ocr_error}", 'warning')
-                
-                text_content.append(f"--- Page {page_num + 1} ---\n{text}\n")
-                self.log(f"✅ Page {page_num + 1} processed", 'info')
-            
-            doc.close()
-            
-            # Save text file
-            if not self.stop_processing:
-                output_path = os.path.join(self.output_dir.get(), 
-                                         f"{Path(self.pdf_path.get()).stem}_text_ocr.txt")
-                with open(output_path, 'w', encoding='utf-8') as text_file:
-                    text_file.write('\n'.join(text_content))
-                
-                self.log(f"✅ Text saved: {output_path}", 'success')
-                self.update_status("✅ Text extraction completed!", 100)
-                
-        except Exception as e:
-            self.log(f"❌ Error in text conversion: {e}", 'error')
-            self.update_status("❌ Error occurred", 0)
-    
-    def extract_and_ocr(self):
-        if self.stop_processing:
-            return
-        self.update_status("🖼️ Extracting images and performing OCR...", 10)
-        self.log("🖼️ Starting image extraction and OCR...", 'info')
-        
-        try:
-            doc = fitz.open(self.pdf_path.get())
-            total_pages = len(doc)
-            
-            # Create output directories
-            base_name = Path(self.pdf_path.get()).stem
-            images_dir = os.path.join(self.output_dir.get(), f"{base_name}_images")
-            os.makedirs(images_dir, exist_ok=True)
-            
-            all_ocr_text = []
-            total_images_processed = 0
-            total_images_saved = 0
-            
-            for page_num in range(total_pages):
-                if self.stop_processing:
-                    return
-                
-                page = doc[page_num]
-                self.update_status(f"Processing page {page_num + 1}/{total_pages}...", 
-                                 10 + (page_num/total_pages)*80)
-                
-                # Get images from page
-                image_list = page.get_images()
-                page_ocr_text = []
-                
-                self.log(f"📄 Page {page_num + 1}: Found {len(image_list)} images", 'info')
-                
-                for img_index, img in enumerate(image_list):
-                    if self.stop_processing:
-                        return
-                    
-                    total_images_processed += 1
-                    
-                    try:
-                        # Get image data
-                        xref = img[0]
-                        pix = fitz.Pixmap(doc, xref)
-                        
-                        # Log image details for debugging
-                        self.log(f"🔍 Page {page_num + 1}, Image {img_index + 1}: "
-                               f"{pix.width}x{pix.height}, {pix.n} channels", 'info')
-                        
-                        # Handle CMYK images by converting them
-                        if pix.n - pix.alpha >= 4:  # CMYK
-                            self.log(f"🔄 Converting CMYK image {img_index + 1} to RGB", 'info')
-                            pix = fitz.Pixmap(fitz.csRGB, pix)
-                        
-                        # Check if image is worth processing
-                        if not self.is_image_worth_processing(pix, page_num, img_index):
-                            pix = None
-                            continue
-                        
-                        # Convert to PIL Image
-                        img_data = pix.tobytes("png")
-                        img_pil = Image.open(io.BytesIO(img_data))
-                        
-                        # Save image if enabled
-                        if self.extract_images.get():
-                            img_filename = f"page_{page_num + 1}_img_{img_index + 1}.png"
-                            img_path = os.path.join(images_dir, img_filename)
-                            img_pil.save(img_path)
-                            total_images_saved += 1
-                            self.log(f"💾 Saved: {img_filename} ({pix.width}x{pix.height})", 'success')
-                        
-                        # Perform OCR if enabled
-                        if self.enable_ocr.get():
-                            try:
-                                # Enhance image for better OCR
-                                enhanced_img = self.enhance_image_for_ocr(img_pil)
-                                
-                                # Perform OCR with less restrictive character set
-                                ocr_text = pytesseract.image_to_string(enhanced_img, config='--psm 6')
-                                
-                                if ocr_text.strip():
-                                    page_ocr_text.append(f"Image {img_index + 1}: {ocr_text.strip()}")
-                                    self.log(f"📖 OCR completed for image {img_index + 1}: "
-                                           f"{len(ocr_text.strip())} characters", 'success')
-                                else:
-                                    self.log(f"📖 OCR found no text in image {img_index + 1}", 'info')
-                                
-                            except Exception as ocr_error:
-                                self.log(f"⚠️ OCR failed for image {img_index + 1}: {ocr_error}", 'warning')
-                        
-                        pix = None
-                        
-                    except Exception as img_error:
-                        self.log(f"⚠️ Error processing image {img_index + 1}: {img_error}", 'warning')
-                
-                # Add page OCR results
-                if page_ocr_text:
-                    all_ocr_text.append(f"--- Page {page_num + 1} ---\n" + "\n".join(page_ocr_text) + "\n")
-            
-            doc.close()
-            
-            # Save OCR results
-            if not self.stop_processing and all_ocr_text:
-                ocr_output_path = os.path.join(self.output_dir.get(), f"{base_name}_ocr_results.txt")
-                with open(ocr_output_path, 'w', encoding='utf-8') as ocr_file:
-                    ocr_file.write('\n'.join(all_ocr_text))
-                self.log(f"✅ OCR results saved: {ocr_output_path}", 'success')
-            
-            # Summary
-            self.log(f"📊 Summary: {total_images_processed} images processed, "
-                   f"{total_images_saved} images saved", 'success')
-            self.update_status("✅ Image extraction and OCR completed!", 100)
-            
-        except Exception as e:
-            self.log(f"❌ Error in image extraction: {e}", 'error')
-            self.update_status("❌ Error occurred", 0)
-    
-    def enhance_image_for_ocr(self, img):
-        """Enhance image quality for better OCR results"""
-        try:
-            # Convert to grayscale if not already
-            if img.mode != 'L':
-                img = img.convert('L')
-            
-            # Resize if too small (OCR works better on larger images)
-            if img.width < 300 or img.height < 300:
-                scale_factor = max(300 / img.width, 300 / img.height)
-                new_size = (int(img.width * scale_factor), int(img.height * scale_factor))
-                img = img.resize(new_size, Image.Resampling.LANCZOS)
-            
-            # Enhance contrast
-            enhancer = ImageEnhance.Contrast(img)
-            img = enhancer.enhance(1.2)
-            
-            # Enhance sharpness
-            enhancer = ImageEnhance.Sharpness(img)
-            img = enhancer.enhance(1.1)
-            
-            return img
-            
-        except Exception:
-            return img  # Return original if enhancement fails
+            self.events.put(('finished',))
 
 # Main application entry point
 def main():
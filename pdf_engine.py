@@ -0,0 +1,2974 @@
+import PyPDF2
+from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject
+import fitz  # PyMuPDF
+from PIL import Image, ImageEnhance
+import pytesseract
+import numpy as np
+import os
+import io
+import sys
+import time
+import argparse
+import hashlib
+import math
+import concurrent.futures
+import glob
+import multiprocessing
+import queue
+import json
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Optional
+
+OPERATIONS = {
+    "slice_pages": "slice_by_pages",
+    "slice_size": "slice_by_size",
+    "simple_text_extraction": "simple_convert_to_text",
+    "to_text": "convert_to_text",
+    "extract_ocr": "extract_and_ocr",
+}
+
+
+@dataclass
+class ProcessingOptions:
+    """Settings for one run of a PDF operation, independent of any UI"""
+    pdf_path: str
+    output_dir: str
+    operation: str = "slice_pages"
+    start_page: int = 1
+    end_page: Optional[int] = None  # None means the last page
+    page_ranges: Optional[str] = None  # slice_pages: "1-12,13-40,41-" writes one file per range
+    split_by_outline: bool = False  # slice_pages: one file per top-level bookmark
+    slice_workers: int = 1  # slice_pages ranges (fitz backend) or planned slice_size parts: write in parallel
+    max_size_mb: float = 5.0
+    enable_ocr: bool = True
+    extract_images: bool = True
+    smart_filtering: bool = True
+    min_image_size: int = 150
+    size_accounting: str = "incremental"  # "incremental" or "exact" (re-serialize after every page)
+    verify_part_size: bool = True
+    plan_parts: bool = False  # slice_size: choose every part boundary before writing, then write parts concurrently
+    balance_parts: bool = False  # slice_size: planned parts of even size instead of a small last part
+    dry_run: bool = False  # slice_size: log the planned parts and write nothing
+    slice_backend: str = "pypdf2"  # "pypdf2" or "fitz" (PyMuPDF insert_pdf, native and faster)
+    text_backend: str = "pypdf2"  # simple_text_extraction: "pypdf2" or "fitz" (get_text, much faster)
+    text_workers: int = 1  # simple_text_extraction: processes extracting page chunks in parallel
+    text_chunk_pages: int = 100  # pages per chunk handed to a text worker
+    fitz_garbage: int = 1  # fitz backend: 1 drop unused objects, 2 compact xref, 3 merge duplicates, 4 also dedup streams
+    fitz_deflate: bool = True  # fitz backend: compress uncompressed streams
+    ocr_workers: int = 1  # processes for convert_to_text; 0 means one per CPU core
+    ocr_threads: int = 1  # pipeline threads running Tesseract while the next page/image is prepared
+    filter_threads: int = 1  # extract_ocr pipeline threads for image filtering
+    save_threads: int = 1  # extract_ocr pipeline threads encoding and writing saved images
+    image_save_mode: str = "png"  # "png" (decoded pixels) or "original" (embedded JPEG/JPEG 2000 stream as-is)
+    pipeline_queue_size: int = 4  # items waiting between two pipeline stages
+    pipeline_memory_mb: float = 512.0  # ceiling on decoded page/image pixels held in the pipeline
+    single_pass_ocr: bool = False  # gate and OCR images with one image_to_data call
+    ocr_confidence_threshold: int = 30
+    ocr_min_text_length: int = 3
+    ocr_language: str = "eng"
+    ocr_backend: str = "auto"  # a name in OCR_BACKENDS; "auto" takes the first one available
+    ocr_dpi: Optional[float] = None  # to_text page render DPI; None picks it per page (144 = the old fixed 2x)
+    ocr_pixel_budget: int = 12_000_000  # most pixels one page render may have
+    ocr_grayscale: bool = False  # render pages straight to grayscale for OCR
+    ocr_prescan: bool = True  # to_text: classify pages first, OCR only those that need it, skip blank ones
+    ocr_cache_dir: Optional[str] = None  # persistent OCR result cache; None disables it
+    ocr_cache_size_mb: float = 512.0
+    resume: bool = True  # to_text: continue from the job journal left by an interrupted run
+    profile: bool = False  # per-stage timing summary in the log
+    profile_output: Optional[str] = None  # also export the profile to this file
+    profile_format: str = "json"  # "json" (aggregates) or "chrome" (trace events for chrome://tracing)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "stage", "page", "start")
+
+    def __init__(self, profiler, stage, page):
+        self.profiler = profiler
+        self.stage = stage
+        self.page = page
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add(self.stage, time.perf_counter() - self.start, self.page, self.start)
+        return False
+
+
+class StageProfiler:
+    """Per-stage wall-clock spans; a disabled profiler hands out one shared no-op span.
+
+    Spans are kept flat (never nested) so per-page totals are the sum of their spans.
+    """
+
+    def __init__(self, enabled=False, keep_events=False):
+        self.enabled = enabled
+        self.keep_events = keep_events
+        self.stage_times = {}  # stage -> [seconds]
+        self.page_times = {}   # page index -> seconds
+        self.events = []       # (stage, page, start, seconds, pid, tid) for trace export
+        self._lock = threading.Lock()
+
+    def span(self, stage, page=None):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage, page)
+
+    def add(self, stage, seconds, page=None, start=None, pid=None, tid=None):
+        with self._lock:
+            self.stage_times.setdefault(stage, []).append(seconds)
+            if page is not None:
+                self.page_times[page] = self.page_times.get(page, 0.0) + seconds
+            if self.keep_events:
+                self.events.append((stage, page, start, seconds,
+                                    pid or os.getpid(), tid or threading.get_ident()))
+
+    def drain_spans(self):
+        """Hand raw spans to another process's profiler (see merge)"""
+        with self._lock:
+            spans = [(stage, page, start, seconds, pid, tid)
+                     for stage, page, start, seconds, pid, tid in self.events]
+            self.events = []
+            self.stage_times = {}
+            self.page_times = {}
+        return spans
+
+    def merge(self, spans):
+        for stage, page, start, seconds, pid, tid in spans:
+            self.add(stage, seconds, page, start, pid, tid)
+
+    @staticmethod
+    def _aggregate(values):
+        ordered = sorted(values)
+        return {
+            "count": len(ordered),
+            "total": sum(ordered),
+            "p50": ordered[int(0.50 * (len(ordered) - 1))],
+            "p95": ordered[int(0.95 * (len(ordered) - 1))],
+        }
+
+    def summary(self):
+        stages = {stage: self._aggregate(values) for stage, values in self.stage_times.items()}
+        pages = self._aggregate(list(self.page_times.values())) if self.page_times else None
+        return {"stages": stages, "pages": pages,
+                "per_page_seconds": {page + 1: seconds for page, seconds in sorted(self.page_times.items())}}
+
+    def summary_lines(self):
+        summary = self.summary()
+        lines = [f"{'stage':<14}{'count':>7}{'total s':>10}{'p50 ms':>10}{'p95 ms':>10}"]
+        rows = sorted(summary["stages"].items(), key=lambda item: -item[1]["total"])
+        if summary["pages"]:
+            rows.append(("per page", summary["pages"]))
+        for name, agg in rows:
+            lines.append(f"{name:<14}{agg['count']:>7}{agg['total']:>10.2f}"
+                         f"{agg['p50'] * 1000:>10.1f}{agg['p95'] * 1000:>10.1f}")
+        return lines
+
+    def export(self, path, fmt="json"):
+        if fmt == "chrome":
+            events = [{"name": stage, "cat": "pdf", "ph": "X", "ts": start * 1e6, "dur": seconds * 1e6,
+                       "pid": pid, "tid": tid, "args": {"page": None if page is None else page + 1}}
+                      for stage, page, start, seconds, pid, tid in self.events
+                      if start is not None]  # a span without a start cannot be placed on the timeline
+            data = {"traceEvents": events, "displayTimeUnit": "ms"}
+        else:
+            data = self.summary()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+
+# PIL mode for each (colour channels, alpha) combination a Pixmap can have
+PIXMAP_MODES = {(1, 0): "L", (1, 1): "LA", (3, 0): "RGB", (3, 1): "RGBA"}
+
+
+# Embedded image filters whose stream is a complete image file on its own
+ORIGINAL_IMAGE_FILTERS = ("/DCTDecode", "/JPXDecode")
+
+
+def original_image_stream(doc, xref):
+    """(extension, bytes) of an embedded JPEG / JPEG 2000 that can be saved unchanged, else None.
+
+    Soft masks, Decode arrays and CMYK or other non-gray/RGB colour need the pixmap path
+    to come out looking as they do in the PDF.
+    """
+    if doc.xref_get_key(xref, "Filter")[1] not in ORIGINAL_IMAGE_FILTERS:
+        return None
+    if doc.xref_get_key(xref, "SMask")[0] != "null" or doc.xref_get_key(xref, "Decode")[0] != "null":
+        return None
+    info = doc.extract_image(xref)
+    if not info or info.get("smask") or info.get("colorspace") not in (1, 3):
+        return None
+    return info["ext"], info["image"]
+
+
+ICC_BASED_PATTERN = re.compile(r"^\[\s*/ICCBased\s+(\d+) 0 R")
+
+
+def image_icc_profile(doc, xref):
+    """The ICC profile of an /ICCBased image, as pix.tobytes("png") wrote it into PNGs, else None"""
+    kind, value = doc.xref_get_key(xref, "ColorSpace")
+    if kind == "xref":
+        value = doc.xref_object(int(value.split()[0]), compressed=True)
+    elif kind != "array":
+        return None
+    match = ICC_BASED_PATTERN.match(value)
+    return doc.xref_stream(int(match.group(1))) if match else None
+
+
+def pixmap_to_pil(pix):
+    """Wrap a Pixmap's raw samples as a PIL image, without a PNG encode/decode round-trip"""
+    if (pix.n - pix.alpha, pix.alpha) not in PIXMAP_MODES:
+        pix = fitz.Pixmap(fitz.csRGB, pix)  # CMYK and other colour spaces
+    mode = PIXMAP_MODES[(pix.n - pix.alpha, pix.alpha)]
+    return Image.frombuffer(mode, (pix.width, pix.height), pix.samples, "raw", mode, pix.stride, 1)
+
+
+class PartSizeEstimator:
+    """Tracks the approximate serialized size of a PDF part as pages are added.
+
+    Each indirect object reachable from a page (content streams, fonts, images, ...)
+    is counted once per part, mirroring how PdfWriter clones shared objects.
+    """
+
+    OBJECT_OVERHEAD = 40     # "N 0 obj ... endobj" wrapper plus the xref entry
+    PAGE_TREE_ENTRY = 10     # "N 0 R " in the /Kids array
+    TRAILER_OVERHEAD = 400   # header, catalog, page tree, info dict and trailer
+    SKIP_KEYS = ("/Parent", "/StructParents")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.size = self.TRAILER_OVERHEAD
+        self.seen = set()
+
+    def page_cost(self, page):
+        """Return (bytes, {object id: bytes}) a page would add to the current part"""
+        new_ids = {}
+        cost = self._object_size(page) + self.OBJECT_OVERHEAD + self.PAGE_TREE_ENTRY
+        stack = [value for key, value in page.items() if key not in self.SKIP_KEYS]
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, IndirectObject):
+                key = (obj.idnum, obj.generation)
+                if key in self.seen or key in new_ids:
+                    continue
+                obj = obj.get_object()
+                new_ids[key] = self._object_size(obj) + self.OBJECT_OVERHEAD
+                cost += new_ids[key]
+            if isinstance(obj, DictionaryObject):
+                stack.extend(value for key, value in obj.items() if key not in self.SKIP_KEYS)
+            elif isinstance(obj, ArrayObject):
+                stack.extend(obj)
+        return cost, new_ids
+
+    def add(self, cost, new_ids):
+        self.size += cost
+        self.seen.update(new_ids)
+
+    @staticmethod
+    def _object_size(obj):
+        try:
+            buffer = io.BytesIO()
+            obj.write_to_stream(buffer, None)
+            return buffer.tell()
+        except Exception:
+            return 0
+
+
+class FitzPartSizeEstimator(PartSizeEstimator):
+    """PartSizeEstimator for the fitz backend, walking xrefs instead of PyPDF2 objects.
+
+    Pages are given by index. Stream sizes come from /Length, so stream data is never read.
+    With deflate or garbage collection the saved part is usually smaller than estimated.
+    """
+
+    REF_PATTERN = re.compile(rb"(\d+) \d+ R")
+    SKIP_PATTERN = re.compile(rb"/(?:Parent|StructParents) *\d+ \d+ R")
+
+    def __init__(self, doc):
+        self.doc = doc
+        super().__init__()
+
+    def page_cost(self, page_num):
+        new_ids = {}
+        cost = self.PAGE_TREE_ENTRY
+        stack = [self.doc.page_xref(page_num)]
+        while stack:
+            xref = stack.pop()
+            if xref in self.seen or xref in new_ids:
+                continue
+            source = self.doc.xref_object(xref, compressed=True).encode('latin-1', 'replace')
+            new_ids[xref] = len(source) + self._stream_length(xref) + self.OBJECT_OVERHEAD
+            cost += new_ids[xref]
+            source = self.SKIP_PATTERN.sub(b"", source)
+            stack.extend(int(ref) for ref in self.REF_PATTERN.findall(source))
+        return cost, new_ids
+
+    def _stream_length(self, xref):
+        if not self.doc.xref_is_stream(xref):
+            return 0
+        kind, value = self.doc.xref_get_key(xref, "Length")
+        if kind == "int":
+            return int(value)
+        return len(self.doc.xref_stream_raw(xref) or b"")
+
+
+class SizePlanner:
+    """Chooses every slice_size part boundary up front from per-page footprints.
+
+    Each page is walked once with an empty estimator. A part's estimate is the trailer, plus
+    each page's own bytes, plus every object its pages reach counted once, as in page_cost.
+    """
+
+    def __init__(self, estimator):
+        self.estimator = estimator
+        self.pages = []  # (own bytes, {object id: bytes}) per page
+
+    def measure(self, page):
+        self.estimator.reset()
+        cost, objects = self.estimator.page_cost(page)
+        self.pages.append((cost - sum(objects.values()), objects))
+
+    def split(self, max_bytes):
+        """Greedy parts under max_bytes as [(start, end, estimated bytes)], 0-based, end exclusive"""
+        parts = []
+        start, size, seen = 0, self.estimator.TRAILER_OVERHEAD, set()
+        for i, (own, objects) in enumerate(self.pages):
+            extra = own + sum(cost for key, cost in objects.items() if key not in seen)
+            if i > start and size + extra > max_bytes:
+                parts.append((start, i, size))
+                start, size, seen = i, self.estimator.TRAILER_OVERHEAD, set()
+                extra = own + sum(objects.values())
+            size += extra
+            seen.update(objects)
+        if self.pages:
+            parts.append((start, len(self.pages), size))
+        return parts
+
+    def plan(self, max_bytes, balance=False):
+        parts = self.split(max_bytes)
+        if balance and len(parts) > 1:
+            # The smallest limit that needs no extra part spreads pages evenly instead of leaving a runt
+            low, high = 1, max_bytes
+            while low < high:
+                middle = (low + high) // 2
+                if len(self.split(middle)) <= len(parts):
+                    high = middle
+                else:
+                    low = middle + 1
+            parts = self.split(high)
+        return parts
+
+
+class StreamingTextWriter:
+    """Appends text blocks to '<path>.part' as they complete, renaming it into place at the end.
+
+    Blocks are separated by a newline, as with str.join. At most max_buffer_bytes (or
+    flush_interval seconds) of text is held before it is flushed, so memory stays flat and
+    the partial file can be read while a long job runs.
+    """
+
+    def __init__(self, path, max_buffer_bytes=64 * 1024, flush_interval=1.0):
+        self.path = path
+        self.temp_path = path + ".part"
+        self.max_buffer_bytes = max_buffer_bytes
+        self.flush_interval = flush_interval
+        self.blocks_written = 0
+        self._file = None
+        self._buffer = []
+        self._buffered = 0
+        self._last_flush = time.monotonic()
+        self._committed = False
+
+    def write_block(self, block):
+        if self.blocks_written:
+            self._buffer.append('\n')
+        self._buffer.append(block)
+        self._buffered += len(block) + 1
+        self.blocks_written += 1
+        if self._buffered >= self.max_buffer_bytes or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self._file is None:
+            self._file = open(self.temp_path, 'w', encoding='utf-8')
+        if self._buffer:
+            self._file.write(''.join(self._buffer))
+            self._file.flush()
+            self._buffer = []
+            self._buffered = 0
+        self._last_flush = time.monotonic()
+
+    def commit(self):
+        """Flush everything and atomically replace the final output file"""
+        self.flush()
+        self._file.close()
+        self._file = None
+        os.replace(self.temp_path, self.path)
+        self._committed = True
+
+    def close(self):
+        """Close without committing; returns True if a partial '.part' file was left behind"""
+        if self._committed:
+            return False
+        if self._buffer or self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+        return os.path.exists(self.temp_path)
+
+
+@dataclass
+class ImageRecord:
+    """Outcome of processing one distinct image, reused for every repeat of it"""
+    accepted: bool
+    ocr_text: Optional[str] = None
+    saved_filename: Optional[str] = None
+
+
+class ImageCache:
+    """Identity cache for embedded images, keyed by xref with a content-hash fallback"""
+
+    def __init__(self):
+        self.by_xref = {}
+        self.by_hash = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def content_key(pix):
+        digest = hashlib.sha1(pix.samples).hexdigest()
+        return f"{pix.width}x{pix.height}x{pix.n}:{digest}"
+
+    def get_by_xref(self, xref):
+        record = self.by_xref.get(xref)
+        if record is not None:
+            self.hits += 1
+        return record
+
+    def get_by_content(self, xref, key):
+        record = self.by_hash.get(key)
+        if record is not None:
+            self.hits += 1
+            self.by_xref[xref] = record
+        return record
+
+    def store(self, xref, key, record):
+        self.misses += 1
+        self.by_xref[xref] = record
+        self.by_hash[key] = record
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class OCRCache:
+    """Content-addressed SQLite cache of OCR results with LRU eviction.
+
+    Entries are keyed by a hash of the exact pixels sent to Tesseract together with
+    the config string, language and Tesseract version, so any of those changing is a miss.
+    """
+
+    DB_NAME = "ocr_cache.sqlite3"
+
+    def __init__(self, cache_dir, max_size_mb=512.0):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, self.DB_NAME), timeout=30,
+                                     check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS entries ("
+                           "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                           "size INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    @staticmethod
+    def make_key(img, config, lang, output):
+        digest = hashlib.sha256()
+        digest.update(f"{img.mode}:{img.width}x{img.height}:{config}:{lang}:{output}:"
+                      f"{current_ocr_backend().name}:{tesseract_version()}".encode())
+        digest.update(img.tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            self._local.last_hit = row is not None
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return json.loads(row[0])
+
+    @property
+    def last_hit(self):
+        """Whether this thread's most recent lookup was a hit (None before any lookup)"""
+        return getattr(self._local, "last_hit", None)
+
+    def put(self, key, value):
+        encoded = json.dumps(value)
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO entries (key, value, size, last_used) "
+                               "VALUES (?, ?, ?, ?)", (key, encoded, len(encoded), time.time()))
+            self._total_bytes += len(encoded)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache is back under 90% of its cap"""
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY last_used")
+        stale = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            stale.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", stale)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class OCRBackend:
+    """An OCR engine with pytesseract's image_to_string / image_to_data (Output.DICT) results"""
+
+    name = "base"
+
+    @classmethod
+    def is_available(cls):
+        return False
+
+    def version(self):
+        return "unknown"
+
+    def image_to_string(self, img, lang, config):
+        raise NotImplementedError
+
+    def image_to_data(self, img, lang, config):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PytesseractBackend(OCRBackend):
+    """Every call writes a temp image and starts a tesseract process that reloads the model"""
+
+    name = "pytesseract"
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+    def version(self):
+        try:
+            return str(pytesseract.get_tesseract_version())
+        except Exception:
+            return "unknown"
+
+    def image_to_string(self, img, lang, config):
+        return pytesseract.image_to_string(img, lang=lang, config=config)
+
+    def image_to_data(self, img, lang, config):
+        return pytesseract.image_to_data(img, lang=lang, config=config, output_type=pytesseract.Output.DICT)
+
+
+# Preference order for "auto"
+OCR_BACKENDS = {backend.name: backend for backend in (PytesseractBackend,)}
+
+
+def available_ocr_backends():
+    return [name for name, backend in OCR_BACKENDS.items() if backend.is_available()]
+
+
+_ocr_backend = None
+
+
+def use_ocr_backend(name="auto"):
+    """Select the process-wide OCR backend used by run_ocr; returns it"""
+    global _ocr_backend
+    if name == "auto":
+        name = available_ocr_backends()[0]
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend: {name}")
+    if _ocr_backend is not None and _ocr_backend.name == name:
+        return _ocr_backend
+    if not OCR_BACKENDS[name].is_available():
+        raise ValueError(f"OCR backend '{name}' is not available here")
+    if _ocr_backend is not None:
+        _ocr_backend.close()
+    _ocr_backend = OCR_BACKENDS[name]()
+    return _ocr_backend
+
+
+def current_ocr_backend():
+    return _ocr_backend or use_ocr_backend(PytesseractBackend.name)
+
+
+_tesseract_versions = {}
+
+
+def tesseract_version():
+    backend = current_ocr_backend()
+    if backend.name not in _tesseract_versions:
+        try:
+            _tesseract_versions[backend.name] = backend.version()
+        except Exception:
+            _tesseract_versions[backend.name] = "unknown"
+    return _tesseract_versions[backend.name]
+
+
+def run_ocr(img, config, lang="eng", output="string", cache=None):
+    """Run Tesseract on a PIL image (image_to_string or image_to_data), via the cache if given"""
+    key = None
+    if cache is not None:
+        key = OCRCache.make_key(img, config, lang, output)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    backend = current_ocr_backend()
+    if output == "data":
+        result = backend.image_to_data(img, lang, config)
+    else:
+        result = backend.image_to_string(img, lang, config)
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+@dataclass
+class ImageStats:
+    """Cheap statistics used to decide whether an image is worth OCR'ing"""
+    unique_levels: int
+    std_dev: float
+
+
+class ImageQualityFilter:
+    """Class to filter and assess image quality for OCR processing"""
+
+    MIN_UNIQUE_LEVELS = 10
+    MIN_STD_DEV = 15
+    ANALYSIS_SIZE = 500  # samples fit in ANALYSIS_SIZE x ANALYSIS_SIZE, like the former thumbnail
+
+    @staticmethod
+    def is_meaningful_image(pix, img_pil=None, min_size=100, max_aspect_ratio=10, stats=None):
+        """Check if image is meaningful for OCR processing"""
+        try:
+            # Size check - increased minimum size
+            if pix.width < min_size or pix.height < min_size:
+                return False, f"Too small ({pix.width}x{pix.height})"
+
+            # Aspect ratio check - avoid very thin/wide images (likely decorative lines)
+            aspect_ratio = max(pix.width, pix.height) / min(pix.width, pix.height)
+            if aspect_ratio > max_aspect_ratio:
+                return False, f"Extreme aspect ratio ({aspect_ratio:.1f}:1)"
+
+            # Area check - minimum area threshold
+            area = pix.width * pix.height
+            if area < min_size * min_size:
+                return False, f"Insufficient area ({area} pixels)"
+
+            if stats is None:
+                # Convert to PIL Image if not provided
+                if img_pil is None:
+                    img_pil = pixmap_to_pil(pix)
+                stats = ImageQualityFilter.analyze(img_pil)
+
+            # Complexity check - avoid solid color images
+            if stats.unique_levels < ImageQualityFilter.MIN_UNIQUE_LEVELS:
+                return False, "Low complexity (solid/gradient)"
+
+            # Variance check - ensure image has enough detail
+            if stats.std_dev < ImageQualityFilter.MIN_STD_DEV:
+                return False, "Low variance (uniform content)"
+
+            return True, "Passed all checks"
+
+        except Exception as e:
+            return False, f"Error in quality check: {e}"
+
+    @staticmethod
+    def analyze(img):
+        """Grey-level count and std-dev of one image in a single pass"""
+        values = ImageQualityFilter._gray_sample(img).ravel()
+        unique_levels = np.count_nonzero(np.bincount(values, minlength=256))
+        return ImageStats(int(unique_levels), float(values.std()))
+
+    @staticmethod
+    def _gray_sample(img):
+        """Greyscale as convert('L'), area-averaged to fit ANALYSIS_SIZE x ANALYSIS_SIZE.
+
+        A BOX resize at a fractional scale keeps the intermediate grey levels a bilevel scan
+        gains when shrunk, as the former LANCZOS thumbnail did; picking every Nth pixel does not.
+        """
+        gray = img if img.mode == "L" else img.convert("L")
+        limit = ImageQualityFilter.ANALYSIS_SIZE
+        if gray.width * gray.height > limit * limit:
+            scale = min(limit / gray.width, limit / gray.height)
+            size = (max(1, round(gray.width * scale)), max(1, round(gray.height * scale)))
+            gray = gray.resize(size, Image.Resampling.BOX)
+        return np.asarray(gray)
+
+    @staticmethod
+    def quick_ocr_test(img, confidence_threshold=30, min_text_length=3, lang="eng", ocr_cache=None):
+        """Perform a quick OCR test to check if image likely contains text"""
+        try:
+            # Resize image for faster OCR test
+            test_img = img.copy()
+            if test_img.width > 800 or test_img.height > 800:
+                test_img.thumbnail((800, 800), Image.Resampling.LANCZOS)
+
+            # Quick OCR with confidence data
+            try:
+                data = run_ocr(test_img, '--psm 6', lang, "data", ocr_cache)
+                return ImageQualityFilter._score_ocr_data(data, confidence_threshold, min_text_length)
+
+            except Exception as e:
+                # Fallback to simple text extraction
+                text = run_ocr(test_img, '--psm 6', lang, "string", ocr_cache)
+                if len(text.strip()) > min_text_length:
+                    return True, "Text detected (fallback method)"
+                else:
+                    return False, "No meaningful text detected"
+
+        except Exception as e:
+            return False, f"OCR test failed: {e}"
+
+    @staticmethod
+    def ocr_with_confidence(img, confidence_threshold=30, min_text_length=3, config='--psm 6',
+                            lang="eng", ocr_cache=None):
+        """Single Tesseract pass that both gates the image and returns its text"""
+        try:
+            data = run_ocr(img, config, lang, "data", ocr_cache)
+        except Exception as e:
+            return False, f"OCR test failed: {e}", ""
+        has_text, reason = ImageQualityFilter._score_ocr_data(data, confidence_threshold, min_text_length)
+        return has_text, reason, ImageQualityFilter.text_from_ocr_data(data)
+
+    @staticmethod
+    def _score_ocr_data(data, confidence_threshold, min_text_length):
+        """Decide from image_to_data output whether the image holds readable text"""
+        confidences = [int(conf) for conf in data['conf'] if int(conf) > 0]
+
+        if not confidences:
+            return False, "No text detected"
+
+        avg_confidence = sum(confidences) / len(confidences)
+        detected_text = ' '.join([data['text'][i] for i in range(len(data['text']))
+                                if int(data['conf'][i]) > confidence_threshold])
+
+        if avg_confidence >= confidence_threshold and len(detected_text.strip()) > min_text_length:
+            return True, f"Text detected (confidence: {avg_confidence:.1f}%)"
+        else:
+            return False, f"Low confidence text ({avg_confidence:.1f}%)"
+
+    @staticmethod
+    def text_from_ocr_data(data):
+        """Rebuild plain text from image_to_data word boxes, one line per Tesseract line"""
+        lines = {}
+        for i, word in enumerate(data['text']):
+            if word.strip():
+                key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+                lines.setdefault(key, []).append(word)
+        return '\n'.join(' '.join(words) for words in lines.values())
+
+
+class AdaptiveRenderer:
+    """Picks each page's OCR render resolution and renders it within a pixel budget.
+
+    Pages with some vector text are rendered so their smallest common glyphs reach
+    TARGET_GLYPH_PX. Scanned pages are rendered at the resolution of their largest embedded
+    image, because rendering finer adds no detail. Anything else gets FALLBACK_DPI. The
+    result is clamped to MIN_DPI..MAX_DPI and then to the pixel budget.
+    """
+
+    TARGET_GLYPH_PX = 24     # font size in pixels that Tesseract reads reliably
+    FALLBACK_DPI = 200
+    MIN_DPI = 72
+    MAX_DPI = 400
+    MIN_IMAGE_COVERAGE = 0.25  # an image must cover this much of the page to count as the scan
+
+    def __init__(self, options):
+        self.fixed_dpi = options.ocr_dpi
+        self.pixel_budget = options.ocr_pixel_budget
+        self.colorspace = fitz.csGRAY if options.ocr_grayscale else fitz.csRGB
+
+    def choose_dpi(self, page):
+        dpi = self.fixed_dpi or self._glyph_dpi(page) or self._image_dpi(page) or self.FALLBACK_DPI
+        if not self.fixed_dpi:
+            dpi = min(max(dpi, self.MIN_DPI), self.MAX_DPI)
+        return min(dpi, self.budget_dpi(page))
+
+    def budget_dpi(self, page):
+        """Highest DPI at which the page stays within the pixel budget"""
+        area_points = max(page.rect.width * page.rect.height, 1.0)
+        return 72 * math.sqrt(self.pixel_budget / area_points)
+
+    def render_bytes(self, page, dpi):
+        """Size of the pixmap render() would produce at dpi"""
+        channels = 1 if self.colorspace is fitz.csGRAY else 3
+        return int(page.rect.width * dpi / 72 + 1) * int(page.rect.height * dpi / 72 + 1) * channels
+
+    def render(self, page, dpi=None):
+        dpi = dpi or self.choose_dpi(page)
+        return page.get_pixmap(dpi=max(1, round(dpi)), colorspace=self.colorspace, alpha=False), dpi
+
+    def _glyph_dpi(self, page):
+        sizes = sorted(span["size"] for block in page.get_text("dict")["blocks"]
+                       for line in block.get("lines", ()) for span in line["spans"]
+                       if span["text"].strip() and span["size"] > 0)
+        if not sizes:
+            return None
+        small = sizes[len(sizes) // 10]  # 10th percentile ignores stray tiny glyphs
+        return self.TARGET_GLYPH_PX * 72 / small
+
+    def _image_dpi(self, page):
+        page_area = abs(page.rect) or 1.0
+        best = None
+        for info in page.get_image_info():
+            bbox = fitz.Rect(info["bbox"])
+            if bbox.is_empty or abs(bbox) < page_area * self.MIN_IMAGE_COVERAGE:
+                continue
+            dpi = info["width"] * 72 / bbox.width
+            if best is None or dpi > best:
+                best = dpi
+        return best
+
+
+@dataclass
+class PagePlan:
+    """Pre-scan verdict for one page"""
+    page_num: int
+    kind: str  # "text", "scanned", "mixed", "vector" or "blank"
+    text_chars: int
+    image_coverage: float
+    needs_ocr: bool
+    render_pixels: int = 0
+    dpi: Optional[float] = None  # AdaptiveRenderer's choice, reused for the render
+
+
+@dataclass
+class OCRPlan:
+    pages: list
+
+    SECONDS_PER_MEGAPIXEL = 0.2  # rough Tesseract throughput on one core
+
+    @property
+    def ocr_pages(self):
+        return [plan for plan in self.pages if plan.needs_ocr]
+
+    def estimated_seconds(self, workers=1):
+        megapixels = sum(plan.render_pixels for plan in self.ocr_pages) / 1e6
+        return megapixels * self.SECONDS_PER_MEGAPIXEL / max(1, workers)
+
+    def summary(self, workers=1):
+        counts = {}
+        for plan in self.pages:
+            counts[plan.kind] = counts.get(plan.kind, 0) + 1
+        kinds = ", ".join(f"{count} {kind}" for kind, count in sorted(counts.items(), key=lambda item: -item[1]))
+        megapixels = sum(plan.render_pixels for plan in self.ocr_pages) / 1e6
+        return (f"{kinds}; {len(self.ocr_pages)} pages to OCR ({megapixels:.0f} MP, "
+                f"~{self.estimated_seconds(workers):.0f}s with {workers} worker{'s' if workers > 1 else ''})")
+
+
+class PageClassifier:
+    """Cheap pre-pass that decides, without rendering, which pages need OCR.
+
+    A page needs OCR when it has almost no text, or when a large image covers it and there
+    is too little text for that to be a searchable scan's text layer. Pages with no text,
+    images, drawings or annotations are blank and are neither rendered nor OCR'd.
+    """
+
+    MIN_TEXT_CHARS = 50        # the old "< 50 characters" rule
+    SCAN_COVERAGE = 0.5        # image area share that makes a page look scanned
+    TEXT_LAYER_CHARS = 200     # a scan with this much text already carries a text layer
+
+    def __init__(self, options):
+        self.options = options
+        self.renderer = AdaptiveRenderer(options)
+
+    def classify(self, page, page_num):
+        text_chars = len(page.get_text().strip())
+        coverage = self.image_coverage(page)
+
+        if text_chars == 0 and coverage == 0:
+            if not page.get_drawings() and page.first_annot is None:
+                return PagePlan(page_num, "blank", 0, 0.0, False)
+            kind = "vector"
+        elif coverage >= self.SCAN_COVERAGE:
+            kind = "scanned" if text_chars < self.MIN_TEXT_CHARS else "mixed"
+        else:
+            kind = "text" if text_chars >= self.MIN_TEXT_CHARS else "mixed"
+
+        needs_ocr = self.options.enable_ocr and (
+            text_chars < self.MIN_TEXT_CHARS
+            or (coverage >= self.SCAN_COVERAGE and text_chars < self.TEXT_LAYER_CHARS)
+        )
+        pixels = 0
+        dpi = None
+        if needs_ocr:
+            dpi = self.renderer.choose_dpi(page)
+            pixels = int(page.rect.width * dpi / 72) * int(page.rect.height * dpi / 72)
+        return PagePlan(page_num, kind, text_chars, coverage, needs_ocr, pixels, dpi)
+
+    @staticmethod
+    def image_coverage(page):
+        """Share of the page covered by images; overlapping images may count twice, capped at 1"""
+        page_rect = page.rect
+        page_area = abs(page_rect) or 1.0
+        covered = 0.0
+        for info in page.get_image_info():
+            covered += abs(fitz.Rect(info["bbox"]) & page_rect)
+        return min(1.0, covered / page_area)
+
+
+@dataclass
+class PageText:
+    """Text of one page as produced by convert_to_text"""
+    page_num: int
+    text: str
+    ocr_applied: bool = False
+    ocr_error: Optional[str] = None
+    ocr_cache_hit: Optional[bool] = None  # None when no cached OCR was attempted
+    render_dpi: Optional[float] = None
+    spans: Optional[list] = None  # timing spans recorded in a pool worker
+
+
+def extract_page_text(doc, page_num, options, ocr_cache=None, profiler=None, plan=None):
+    """Extract one page's text, OCR'ing the pages the plan (or, without one, little text) calls for"""
+    result, img, _ = render_page_for_ocr(doc, page_num, options, profiler, plan)
+    if img is not None:
+        ocr_rendered_page(result, img, options, ocr_cache, profiler)
+    return result
+
+
+def render_page_for_ocr(doc, page_num, options, profiler=None, plan=None, memory=None, should_stop=None):
+    """The fitz half of extract_page_text: the page's text plus, when OCR is due, its render.
+
+    Returns (PageText, PIL image or None, bytes reserved from memory for the render).
+    """
+    profiler = profiler or _DISABLED_PROFILER
+    if plan is not None and plan.kind == "blank":
+        return PageText(page_num, ""), None, 0
+    page = doc[page_num]
+
+    # Extract text using PyMuPDF
+    with profiler.span("get_text", page_num):
+        result = PageText(page_num, page.get_text())
+
+    if plan is not None:
+        needs_ocr = plan.needs_ocr
+    else:
+        needs_ocr = options.enable_ocr and len(result.text.strip()) < PageClassifier.MIN_TEXT_CHARS
+    if not needs_ocr:
+        return result, None, 0
+
+    held = 0
+    try:
+        # Convert page to image
+        renderer = AdaptiveRenderer(options)
+        # The prescan already chose the DPI; choosing again would repeat its get_text/image pass
+        dpi = plan.dpi if plan is not None and plan.dpi else renderer.choose_dpi(page)
+        if memory is not None:
+            held = renderer.render_bytes(page, dpi)
+            if not memory.acquire(held, should_stop):
+                return result, None, 0
+        with profiler.span("render", page_num):
+            pix, result.render_dpi = renderer.render(page, dpi)
+        with profiler.span("convert", page_num):
+            img = pixmap_to_pil(pix)
+        return result, img, held
+    except Exception as e:
+        result.ocr_error = str(e)
+        if memory is not None:
+            memory.release(held)
+        return result, None, 0
+
+
+def ocr_rendered_page(result, img, options, ocr_cache=None, profiler=None):
+    """The Tesseract half of extract_page_text; safe to run on any thread"""
+    profiler = profiler or _DISABLED_PROFILER
+    try:
+        with profiler.span("ocr", result.page_num):
+            ocr_text = run_ocr(img, '--psm 1', options.ocr_language, "string", ocr_cache)
+        if ocr_cache:
+            result.ocr_cache_hit = ocr_cache.last_hit
+        if len(ocr_text.strip()) > len(result.text.strip()):
+            result.text = ocr_text
+            result.ocr_applied = True
+    except Exception as e:
+        result.ocr_error = str(e)
+
+
+_DISABLED_PROFILER = StageProfiler(enabled=False)
+
+
+def open_ocr_cache(options):
+    if not options.ocr_cache_dir:
+        return None
+    return OCRCache(options.ocr_cache_dir, options.ocr_cache_size_mb)
+
+
+class PageJournal:
+    """Append-only record of finished pages, kept next to the output while a job runs.
+
+    The first line fingerprints the input file and the settings that affect the text; a
+    journal with a different fingerprint is discarded. Each later line is one page as JSON,
+    flushed as soon as it is written, so a crash loses at most the page in progress.
+    """
+
+    FSYNC_INTERVAL = 5.0
+
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._file = None
+        self._last_sync = time.monotonic()
+
+    @staticmethod
+    def make_fingerprint(options, settings):
+        stat = os.stat(options.pdf_path)
+        identity = [os.path.abspath(options.pdf_path), stat.st_size, stat.st_mtime_ns, settings]
+        return hashlib.sha1(json.dumps(identity, sort_keys=True).encode()).hexdigest()
+
+    def load(self):
+        """Finished pages from a matching journal, as {page_num: PageText}"""
+        pages = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                header = json.loads(f.readline() or "{}")
+                if header.get("fingerprint") != self.fingerprint:
+                    return {}
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn last line from a crash
+                    pages[entry["page"]] = PageText(entry["page"], entry["text"], entry["ocr_applied"])
+        except (OSError, ValueError):
+            return {}
+        return pages
+
+    def open(self, resume_pages):
+        """Start appending; rewrites the journal unless it is being resumed"""
+        if resume_pages:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+            self._file.write(json.dumps({"fingerprint": self.fingerprint}) + "\n")
+            self._file.flush()
+
+    def record(self, result):
+        self._file.write(json.dumps({"page": result.page_num, "text": result.text,
+                                     "ocr_applied": result.ocr_applied}) + "\n")
+        self._file.flush()
+        if time.monotonic() - self._last_sync >= self.FSYNC_INTERVAL:
+            os.fsync(self._file.fileno())
+            self._last_sync = time.monotonic()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class DocumentHandle:
+    """One opened PDF, parsed lazily: fitz for page count/metadata and rendering, PyPDF2 for slicing.
+
+    Handles are shared between jobs on the same file and reference-counted: acquire_document()
+    hands one out and release() gives it back, so an operation never closes one itself and
+    eviction never closes one still in use. Two operations must not use one handle at the same time.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.stat_key = self.file_key(path)
+        self.users = 0  # acquire_document() holders; users and cached change under _document_lock
+        self.cached = True
+        self._doc = None
+        self._reader = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def file_key(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def doc(self):
+        """fitz document; opening only reads the xref, not the page contents"""
+        with self._lock:
+            if self._doc is None:
+                self._doc = fitz.open(self.path)
+            return self._doc
+
+    @property
+    def reader(self):
+        with self._lock:
+            if self._reader is None:
+                self._file = open(self.path, 'rb')
+                self._reader = PyPDF2.PdfReader(self._file)
+            return self._reader
+
+    @property
+    def page_count(self):
+        return self.doc.page_count
+
+    @property
+    def metadata(self):
+        return self.doc.metadata or {}
+
+    @property
+    def size_mb(self):
+        return self.stat_key[1] / (1024 * 1024)
+
+    def is_current(self):
+        try:
+            return self.file_key(self.path) == self.stat_key
+        except OSError:
+            return False
+
+    def release(self):
+        """Give back one acquire_document() hold; the last holder closes an evicted handle"""
+        with _document_lock:
+            self.users -= 1
+            if self.users:
+                return
+            if self.cached:
+                # Only the PyPDF2 reader is dropped: it is cheap to rebuild, while the cached
+                # fitz document (which keeps the file open too) is what the next job reuses
+                self.release_reader()
+            else:
+                self.close()
+
+    def release_reader(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._reader = self._file = None
+
+    def close(self):
+        with self._lock:
+            if self._doc is not None:
+                self._doc.close()
+            if self._file is not None:
+                self._file.close()
+            self._doc = self._reader = self._file = None
+
+
+_document_handles = {}  # absolute path -> DocumentHandle, most recently used last
+_document_lock = threading.Lock()
+MAX_OPEN_DOCUMENTS = 2
+
+
+def read_document_info(path):
+    """(page count, size in MB, metadata) from a short-lived document of its own.
+
+    For callers outside an operation, such as the GUI, which must not share a cached
+    fitz document with an engine run that may be rendering from it on another thread.
+    """
+    with fitz.open(path) as doc:
+        return doc.page_count, os.path.getsize(path) / (1024 * 1024), doc.metadata or {}
+
+
+def acquire_document(path):
+    """Shared handle for path, reopened when the file's mtime or size has changed.
+
+    The caller must call handle.release() when done with it.
+    """
+    key = os.path.abspath(path)
+    with _document_lock:
+        handle = _document_handles.pop(key, None)
+        if handle is not None and not handle.is_current():
+            _discard_document(handle)
+            handle = None
+        if handle is None:
+            handle = DocumentHandle(key)
+        handle.users += 1
+        _document_handles[key] = handle
+        while len(_document_handles) > MAX_OPEN_DOCUMENTS:
+            _discard_document(_document_handles.pop(next(iter(_document_handles))))
+        return handle
+
+
+def release_document(path):
+    """Drop path's cached handle; it is closed now, or by its last holder's release()"""
+    with _document_lock:
+        handle = _document_handles.pop(os.path.abspath(path), None)
+        if handle is not None:
+            _discard_document(handle)
+
+
+def _discard_document(handle):
+    """Called under _document_lock with a handle no longer in _document_handles"""
+    handle.cached = False
+    if not handle.users:
+        handle.close()
+
+
+def parse_page_ranges(spec, total_pages):
+    """Parse "1-12,13-40,41-" into 1-based inclusive (start, end) pairs; "-5" and "7" also work"""
+    ranges = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        first, dash, last = item.partition('-')
+        try:
+            start = int(first) if first.strip() else 1
+            end = (int(last) if last.strip() else total_pages) if dash else start
+        except ValueError:
+            raise ValueError(f"Invalid page range '{item}'") from None
+        end = min(end, total_pages)
+        if start < 1 or start > end:
+            raise ValueError(f"Page range '{item}' is outside 1-{total_pages}")
+        ranges.append((start, end))
+    if not ranges:
+        raise ValueError("No page ranges given")
+    return ranges
+
+
+def outline_ranges(doc, level=1):
+    """(start, end, title) per bookmark at the given outline level, 1-based and inclusive.
+
+    Pages before the first bookmark become a "front matter" range.
+    """
+    marks = sorted(((page, title) for lvl, title, page, *_ in doc.get_toc() if lvl == level and page >= 1),
+                   key=lambda mark: mark[0])
+    starts = []
+    for page, title in marks:
+        if not starts or page > starts[-1][0]:  # bookmarks sharing a page collapse into the first
+            starts.append((page, title))
+    if not starts:
+        return []
+    if starts[0][0] > 1:
+        starts.insert(0, (1, "front matter"))
+    bounds = [page for page, _ in starts[1:]] + [doc.page_count + 1]
+    return [(page, next_page - 1, title) for (page, title), next_page in zip(starts, bounds)]
+
+
+def _safe_filename(title, max_length=60):
+    return re.sub(r'[^\w\-]+', '_', title).strip('_')[:max_length] or "section"
+
+
+def write_range_fitz(doc, start, end, output_path, options):
+    """Save 1-based pages start..end of a fitz document; returns the file size"""
+    part = fitz.open()
+    try:
+        part.insert_pdf(doc, from_page=start - 1, to_page=end - 1)
+        part.save(output_path, garbage=options.fitz_garbage, deflate=options.fitz_deflate)
+    finally:
+        part.close()
+    return os.path.getsize(output_path)
+
+
+def serialize_part(source, page_indexes, options, profiler=None):
+    """PDF bytes holding the given consecutive pages of a PyPDF2 reader or fitz document"""
+    profiler = profiler or _DISABLED_PROFILER
+    if options.slice_backend == "fitz":
+        part = fitz.open()
+        try:
+            with profiler.span("add_page"):
+                part.insert_pdf(source, from_page=page_indexes[0], to_page=page_indexes[-1])
+            with profiler.span("serialize"):
+                return part.tobytes(garbage=options.fitz_garbage, deflate=options.fitz_deflate)
+        finally:
+            part.close()
+
+    writer = PyPDF2.PdfWriter()
+    with profiler.span("add_page"):
+        for i in page_indexes:
+            writer.add_page(source.pages[i])
+    with profiler.span("serialize"):
+        buffer = io.BytesIO()
+        writer.write(buffer)
+    return buffer.getbuffer()
+
+
+def fit_part(source, page_indexes, max_size_bytes, options, profiler=None):
+    """Serialize a part, dropping trailing pages while verification finds it over the limit.
+
+    Returns (pages kept, bytes, pages left over).
+    """
+    leftover = []
+    while True:
+        data = serialize_part(source, page_indexes, options, profiler)
+        if not options.verify_part_size or len(data) <= max_size_bytes or len(page_indexes) == 1:
+            return page_indexes, data, leftover
+        # The estimate was too low: shrink the part proportionally and retry
+        keep = max(1, min(len(page_indexes) - 1, int(len(page_indexes) * max_size_bytes / len(data))))
+        leftover = page_indexes[keep:] + leftover
+        page_indexes = page_indexes[:keep]
+
+
+def write_planned_part(source, page_indexes, max_size_bytes, path_prefix, options, profiler=None):
+    """Write one planned part, split further if it proves too large; returns [(pages, path, bytes)]"""
+    profiler = profiler or _DISABLED_PROFILER
+    outputs = []
+    while page_indexes:
+        kept, data, page_indexes = fit_part(source, page_indexes, max_size_bytes, options, profiler)
+        path = f"{path_prefix}_{len(outputs)}.pdf"
+        with profiler.span("write"), open(path, 'wb') as output_file:
+            output_file.write(data)
+        outputs.append((len(kept), path, len(data)))
+    return outputs
+
+
+_slice_source = None
+_slice_options = None
+
+
+def _init_slice_worker(options):
+    global _slice_source, _slice_options
+    # Both read only the xref up front; pages are loaded on demand
+    if options.slice_backend == "fitz":
+        _slice_source = fitz.open(options.pdf_path)
+    else:
+        _slice_source = PyPDF2.PdfReader(options.pdf_path)
+    _slice_options = options
+
+
+def _slice_range_worker(start, end, output_path):
+    return write_range_fitz(_slice_source, start, end, output_path, _slice_options)
+
+
+def _planned_part_worker(page_indexes, max_size_bytes, path_prefix):
+    return write_planned_part(_slice_source, page_indexes, max_size_bytes, path_prefix, _slice_options)
+
+
+def open_text_source(path, backend):
+    """The object extract_simple_text reads pages from"""
+    return fitz.open(path) if backend == "fitz" else PyPDF2.PdfReader(path)
+
+
+def text_source_pages(source, backend):
+    return len(source) if backend == "fitz" else len(source.pages)
+
+
+def extract_simple_text(source, page_index, backend):
+    """Text layer of one page as simple_text_extraction writes it"""
+    if backend == "fitz":
+        return source[page_index].get_text()
+    return source.pages[page_index].extract_text() or ""
+
+
+_text_source = None
+_text_backend = None
+
+
+def _init_text_worker(path, backend):
+    global _text_source, _text_backend
+    _text_source = open_text_source(path, backend)
+    _text_backend = backend
+
+
+def _text_chunk_worker(start, end):
+    """Texts of pages start..end-1 (0-based) with each extraction's perf_counter start and duration"""
+    texts = []
+    for page_index in range(start, end):
+        started = time.perf_counter()
+        texts.append((extract_simple_text(_text_source, page_index, _text_backend),
+                      started, time.perf_counter() - started))
+    return texts
+
+
+# Each pool process opens its own document: fitz documents cannot cross process boundaries
+_worker_doc = None
+_worker_options = None
+_worker_cache = None
+
+
+def _init_page_worker(options):
+    global _worker_doc, _worker_options, _worker_cache
+    use_ocr_backend(options.ocr_backend)
+    _worker_doc = fitz.open(options.pdf_path)
+    _worker_options = options
+    _worker_cache = open_ocr_cache(options)
+
+
+def _page_worker(page_num, plan=None):
+    if not _worker_options.profile:
+        return extract_page_text(_worker_doc, page_num, _worker_options, _worker_cache, plan=plan)
+    profiler = StageProfiler(enabled=True, keep_events=True)
+    result = extract_page_text(_worker_doc, page_num, _worker_options, _worker_cache, profiler, plan)
+    result.spans = profiler.drain_spans()
+    return result
+
+
+class MemoryBudget:
+    """Caps the bytes of decoded pixels in flight; acquire() blocks until enough is released.
+
+    An item larger than the whole budget is still let through once nothing else is held.
+    """
+
+    def __init__(self, limit_bytes):
+        self.limit = limit_bytes
+        self.used = 0
+        self.peak = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, nbytes, should_stop=None):
+        """Reserve nbytes; returns False if should_stop() turned true while waiting"""
+        with self._cond:
+            while self.used and self.used + nbytes > self.limit:
+                if should_stop and should_stop():
+                    return False
+                self._cond.wait(0.2)
+            self.used += nbytes
+            self.peak = max(self.peak, self.used)
+            return True
+
+    def release(self, nbytes):
+        if not nbytes:
+            return
+        with self._cond:
+            self.used -= nbytes
+            self._cond.notify_all()
+
+
+@dataclass
+class PipelineStage:
+    name: str
+    fn: Callable
+    workers: int = 1
+
+
+class _StageFailure:
+    __slots__ = ("error",)
+
+    def __init__(self, error):
+        self.error = error
+
+
+_PIPELINE_DONE = object()
+
+
+class StagePipeline:
+    """Pushes items through thread stages joined by bounded queues, yielding results in input order.
+
+    A full queue blocks the stage feeding it, so the slowest stage throttles everything
+    upstream (backpressure). An exception raised by a stage skips the remaining stages for
+    that item and is re-raised to the consumer when the item's turn comes.
+    """
+
+    POLL_SECONDS = 0.2
+
+    def __init__(self, stages, queue_size=4, should_stop=None):
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=max(1, queue_size)) for _ in range(len(stages) + 1)]
+        self.should_stop = should_stop or (lambda: False)
+        self._closed = threading.Event()
+        self._remaining = [stage.workers for stage in stages]
+        self._lock = threading.Lock()
+
+    def _stopped(self):
+        return self._closed.is_set() or self.should_stop()
+
+    def _put(self, target, entry):
+        while not self._stopped():
+            try:
+                target.put(entry, timeout=self.POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source):
+        while not self._stopped():
+            try:
+                return source.get(timeout=self.POLL_SECONDS)
+            except queue.Empty:
+                continue
+        return _PIPELINE_DONE
+
+    def _feed(self, items):
+        try:
+            for entry in enumerate(items):
+                if not self._put(self.queues[0], entry):
+                    return
+        finally:
+            for _ in range(self.stages[0].workers):
+                self._put(self.queues[0], _PIPELINE_DONE)
+
+    def _work(self, index):
+        stage = self.stages[index]
+        inbox, outbox = self.queues[index], self.queues[index + 1]
+        while True:
+            entry = self._get(inbox)
+            if entry is _PIPELINE_DONE:
+                break
+            seq, item = entry
+            if not isinstance(item, _StageFailure):
+                try:
+                    item = stage.fn(item)
+                except Exception as e:
+                    item = _StageFailure(e)
+            if not self._put(outbox, (seq, item)):
+                return
+        # The last worker of a stage tells every worker of the next one that input has ended
+        with self._lock:
+            self._remaining[index] -= 1
+            last = self._remaining[index] == 0
+        if last:
+            downstream = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+            for _ in range(downstream):
+                self._put(outbox, _PIPELINE_DONE)
+
+    def run(self, items):
+        threads = [threading.Thread(target=self._feed, args=(items,), daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads.extend(threading.Thread(target=self._work, args=(index,), daemon=True,
+                                            name=f"pipeline-{stage.name}-{n}")
+                           for n in range(stage.workers))
+        for thread in threads:
+            thread.start()
+        try:
+            buffered = {}
+            next_seq = 0
+            while True:
+                entry = self._get(self.queues[-1])
+                if entry is _PIPELINE_DONE:
+                    return
+                seq, item = entry
+                buffered[seq] = item
+                while next_seq in buffered:
+                    item = buffered.pop(next_seq)
+                    next_seq += 1
+                    if isinstance(item, _StageFailure):
+                        raise item.error
+                    yield item
+        finally:
+            self._closed.set()
+
+
+@dataclass
+class ImageJob:
+    """One image occurrence travelling through the extract_and_ocr pipeline"""
+    page_num: int
+    img_index: int
+    xref: int
+    content_key: Optional[str] = None
+    img: Optional[Image.Image] = None  # decoded pixels, only for the first occurrence of an image
+    channels: int = 0
+    held_bytes: int = 0
+    raw_ext: Optional[str] = None  # with raw_data: the embedded stream, saved instead of re-encoding img
+    raw_data: Optional[bytes] = None
+    icc_profile: Optional[bytes] = None  # embedded in the saved PNG, which PIL would otherwise leave out
+    record: Optional[ImageRecord] = None
+    save_pending: bool = False
+    ocr_pending: bool = False
+    error: Optional[str] = None
+
+
+@dataclass
+class PageImages:
+    page_num: int
+    jobs: list
+
+
+class PDFEngine:
+    """Runs the PDF operations without any GUI, reporting through callbacks"""
+
+    def __init__(self, options: ProcessingOptions,
+                 log_callback: Optional[Callable[[str, str], None]] = None,
+                 status_callback: Optional[Callable[[str, Optional[float]], None]] = None):
+        self.options = options
+        self.log_callback = log_callback
+        self.status_callback = status_callback
+        self.image_filter = ImageQualityFilter()
+        self.stop_processing = False
+        self.error_count = 0
+        self.ocr_cache = None
+        self.document = None  # the input's shared handle, held from first use until run() returns
+        self.outputs = []  # paths this engine has written, in the order they were saved
+        self.profiler = StageProfiler(enabled=options.profile,
+                                      keep_events=options.profile and options.profile_format == "chrome")
+
+    def log(self, message, tag='info'):
+        if tag == 'error':
+            self.error_count += 1
+        if self.log_callback:
+            self.log_callback(message, tag)
+
+    def update_status(self, status, progress=None):
+        if self.status_callback:
+            self.status_callback(status, progress)
+
+    def stop(self):
+        self.stop_processing = True
+
+    def run(self):
+        """Run the configured operation; returns True if it was not stopped"""
+        operation = self.options.operation
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {operation}")
+        self.update_status("Initializing...", 0)
+        self.log("🚀 Starting...", 'info')
+        if operation in ("to_text", "extract_ocr") and self.options.enable_ocr:
+            backend = use_ocr_backend(self.options.ocr_backend)
+            self.log(f"🔤 OCR backend: {backend.name}", 'info')
+        self.ocr_cache = open_ocr_cache(self.options)
+        try:
+            getattr(self, OPERATIONS[operation])()
+        finally:
+            if self.ocr_cache:
+                self.ocr_cache.close()
+                self.ocr_cache = None
+            if self.document is not None:
+                self.document.release()
+                self.document = None
+            if self.profiler.enabled:
+                self._report_profile()
+        if not self.stop_processing:
+            self.update_status("✅ Completed!", 100)
+            self.log("✅ Completed successfully!", 'success')
+            return True
+        self.update_status("⏹️ Stopped", 0)
+        self.log("⏹️ Stopped by user", 'warning')
+        return False
+
+    def _open_document(self):
+        """The input's shared handle, acquired once and released when run() returns"""
+        if self.document is None:
+            self.document = acquire_document(self.options.pdf_path)
+        return self.document
+
+    def _report_profile(self):
+        self.log("⏱️ Stage profile:", 'info')
+        for line in self.profiler.summary_lines():
+            self.log(f"   {line}", 'info')
+        if self.options.profile_output:
+            try:
+                self.profiler.export(self.options.profile_output, self.options.profile_format)
+                self.outputs.append(self.options.profile_output)
+                self.log(f"⏱️ Profile written: {self.options.profile_output}", 'info')
+            except Exception as e:
+                self.log(f"⚠️ Could not write profile: {e}", 'warning')
+
+    def is_image_worth_processing(self, pix, page_num, img_index, img_pil=None, ocr_test=True):
+        """Enhanced image filtering with detailed logging"""
+        if not self.options.smart_filtering:
+            # Basic size check only
+            min_size = self.options.min_image_size
+            if pix.width < min_size or pix.height < min_size:
+                self.log(f"⏭️ Page {page_num + 1}, Image {img_index + 1}: Too small ({pix.width}x{pix.height})", 'filter')
+                return False
+            return True
+
+        # Advanced filtering
+        try:
+            if img_pil is None:
+                img_pil = pixmap_to_pil(pix)
+
+            # Quality assessment
+            with self.profiler.span("filter", page_num):
+                is_worthy, reason = self.image_filter.is_meaningful_image(
+                    pix, img_pil, min_size=self.options.min_image_size
+                )
+
+            if not is_worthy:
+                self.log(f"⏭️ Page {page_num + 1}, Image {img_index + 1}: {reason}", 'filter')
+                return False
+
+            # Quick OCR test if OCR is enabled
+            if self.options.enable_ocr and ocr_test:
+                with self.profiler.span("ocr_test", page_num):
+                    has_text, ocr_reason = self.image_filter.quick_ocr_test(
+                        img_pil, self.options.ocr_confidence_threshold, self.options.ocr_min_text_length,
+                        self.options.ocr_language, self.ocr_cache
+                    )
+                if not has_text:
+                    self.log(f"⏭️ Page {page_num + 1}, Image {img_index + 1}: {ocr_reason}", 'filter')
+                    return False
+                else:
+                    self.log(f"✅ Page {page_num + 1}, Image {img_index + 1}: {ocr_reason}", 'info')
+
+            return True
+
+        except Exception as e:
+            self.log(f"⚠️ Error filtering image {img_index + 1}: {e}", 'warning')
+            return True  # Default to processing if filtering fails
+
+    def simple_convert_to_text(self):
+        if self.stop_processing:
+            return
+        self.update_status("📝 Extracting text...", 10)
+        self.log("📄 Starting simple text extraction...", 'info')
+        output_path = os.path.join(self.options.output_dir, f"{Path(self.options.pdf_path).stem}_simple_text.txt")
+        writer = StreamingTextWriter(output_path)
+        backend = self.options.text_backend
+        try:
+            try:
+                with self.profiler.span("open"):
+                    document = self._open_document()
+                    source = document.doc if backend == "fitz" else document.reader
+                    total_pages = text_source_pages(source, backend)
+                chunk = max(1, self.options.text_chunk_pages)
+                workers = min(self.options.text_workers, math.ceil(total_pages / chunk))
+                if workers > 1:
+                    self.log(f"⚙️ Extracting {chunk}-page chunks with {workers} worker processes", 'info')
+                    texts = self._iter_simple_texts_parallel(total_pages, chunk, workers)
+                else:
+                    texts = self._iter_simple_texts(source, total_pages)
+                for i, text in enumerate(texts):
+                    if self.stop_processing:
+                        return
+                    self.update_status(f"Page {i + 1}/{total_pages}...", 10 + (i/total_pages)*80)
+                    with self.profiler.span("write", i):
+                        writer.write_block(f"--- Page {i + 1} ---\n{text}\n")
+                    self.log(f"✅ Page {i + 1} extracted", 'info')
+            except Exception as e:
+                self.log(f"❌ Error reading PDF: {e}", 'error')
+                return
+            if not self.stop_processing:
+                try:
+                    with self.profiler.span("write"):
+                        writer.commit()
+                    self.outputs.append(output_path)
+                    self.log(f"✅ Saved: {output_path}", 'success')
+                except Exception as e:
+                    self.log(f"❌ Error saving: {e}", 'error')
+        finally:
+            self._close_text_writer(writer)
+
+    def _iter_simple_texts(self, source, total_pages):
+        backend = self.options.text_backend
+        for i in range(total_pages):
+            with self.profiler.span("extract_text", i):
+                text = extract_simple_text(source, i, backend)
+            yield text
+
+    def _iter_simple_texts_parallel(self, total_pages, chunk, workers):
+        """Extract page chunks in a process pool, yielding page texts in order"""
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_text_worker,
+            initargs=(self.options.pdf_path, self.options.text_backend)
+        )
+        try:
+            starts = list(range(0, total_pages, chunk))
+            pending = {}
+            submitted = 0
+            for index, start in enumerate(starts):
+                # A bounded window of chunks keeps memory flat on very long documents
+                while submitted < len(starts) and submitted < index + workers * 2:
+                    chunk_start = starts[submitted]
+                    pending[submitted] = executor.submit(_text_chunk_worker, chunk_start,
+                                                         min(chunk_start + chunk, total_pages))
+                    submitted += 1
+                future = pending.pop(index)
+                while True:
+                    if self.stop_processing:
+                        return
+                    try:
+                        results = future.result(timeout=0.2)
+                        break
+                    except concurrent.futures.TimeoutError:
+                        continue
+                for offset, (text, started, seconds) in enumerate(results):
+                    self.profiler.add("extract_text", seconds, start + offset, started)
+                    yield text
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def slice_by_pages(self):
+        if self.stop_processing:
+            return
+        self.update_status("📄 Slicing pages...", 25)
+        try:
+            # Every range is written from the one cached document
+            document = self._open_document()
+            ranges = self._slice_ranges(document)
+            if not ranges:
+                self.log("⚠️ No pages to slice", 'warning')
+                return
+            if len(ranges) > 1:
+                self.log(f"📑 Writing {len(ranges)} files from one pass over the document", 'info')
+
+            if self.options.slice_backend == "fitz":
+                if self.options.slice_workers > 1 and len(ranges) > 1:
+                    self._write_ranges_parallel(ranges)
+                else:
+                    self._write_ranges_fitz(document.doc, ranges)
+            else:
+                if self.options.slice_workers > 1:
+                    self.log("ℹ️ Parallel range writing needs the fitz backend", 'info')
+                with self.profiler.span("open"):
+                    reader = document.reader
+                self._write_ranges_pypdf2(reader, ranges)
+
+            if not self.stop_processing:
+                self.update_status("✅ Pages sliced successfully!", 100)
+
+        except Exception as e:
+            self.log(f"❌ Error slicing pages: {e}", 'error')
+            self.update_status("❌ Error occurred", 0)
+
+    def _slice_ranges(self, document):
+        """(start, end, output path) for each file slice_pages should write, pages 1-based inclusive"""
+        stem = Path(self.options.pdf_path).stem
+        total_pages = document.page_count
+        if self.options.split_by_outline:
+            sections = outline_ranges(document.doc)
+            if not sections:
+                raise ValueError("The document has no bookmarks to split by")
+            return [(start, end, os.path.join(self.options.output_dir,
+                                              f"{stem}_{index:02d}_{_safe_filename(title)}.pdf"))
+                    for index, (start, end, title) in enumerate(sections, 1)]
+
+        if self.options.page_ranges:
+            spans = parse_page_ranges(self.options.page_ranges, total_pages)
+        else:
+            start = max(1, self.options.start_page)
+            end = total_pages if self.options.end_page is None else min(total_pages, self.options.end_page)
+            spans = [(start, end)] if start <= end else []
+        return [(start, end, os.path.join(self.options.output_dir, f"{stem}_pages_{start}-{end}.pdf"))
+                for start, end in spans]
+
+    def _write_ranges_pypdf2(self, reader, ranges):
+        total = sum(end - start + 1 for start, end, _ in ranges)
+        done = 0
+        for start, end, output_path in ranges:
+            writer = PyPDF2.PdfWriter()
+            for i in range(start - 1, end):
+                if self.stop_processing:
+                    return
+                with self.profiler.span("add_page", i):
+                    writer.add_page(reader.pages[i])
+                done += 1
+                self.update_status(f"Page {i+1}...", 25 + done/total*70)
+                self.log(f"✅ Added page {i+1}", 'info')
+
+            with self.profiler.span("write"), open(output_path, 'wb') as output_file:
+                writer.write(output_file)
+            self.outputs.append(output_path)
+            self.log(f"✅ Saved: {output_path}", 'success')
+
+    def _write_ranges_fitz(self, doc, ranges):
+        for index, (start, end, output_path) in enumerate(ranges):
+            if self.stop_processing:
+                return
+            with self.profiler.span("write"):
+                write_range_fitz(doc, start, end, output_path, self.options)
+            self.outputs.append(output_path)
+            self.log(f"✅ Saved pages {start}-{end}: {output_path}", 'success')
+            self.update_status(f"Saved {index + 1}/{len(ranges)} files...", 25 + (index + 1)/len(ranges)*70)
+
+    def _write_ranges_parallel(self, ranges):
+        workers = min(self.options.slice_workers, len(ranges))
+        self.log(f"⚙️ Writing ranges with {workers} worker processes", 'info')
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_slice_worker, initargs=(self.options,)
+        ) as executor:
+            futures = {executor.submit(_slice_range_worker, start, end, output_path): (start, end, output_path)
+                       for start, end, output_path in ranges}
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                if self.stop_processing:
+                    executor.shutdown(wait=True, cancel_futures=True)
+                    return
+                start, end, output_path = futures[future]
+                future.result()
+                self.outputs.append(output_path)
+                self.log(f"✅ Saved pages {start}-{end}: {output_path}", 'success')
+                self.update_status(f"Saved {done}/{len(ranges)} files...", 25 + done/len(ranges)*70)
+
+    def slice_by_size(self):
+        if self.stop_processing:
+            return
+        self.update_status("💾 Slicing by size...", 10)
+        self.log("💾 Starting size-based slicing...", 'info')
+
+        try:
+            max_size_bytes = self.options.max_size_mb * 1024 * 1024
+
+            document = self._open_document()
+            planned = self.options.plan_parts or self.options.balance_parts or self.options.dry_run
+            if self.options.size_accounting == "exact":
+                if planned:
+                    self.log("ℹ️ Planned parts use incremental size estimates", 'info')
+                else:
+                    if self.options.slice_backend == "fitz":
+                        self.log("ℹ️ Exact size accounting uses the PyPDF2 backend", 'info')
+                    with self.profiler.span("open"):
+                        reader = document.reader
+                    self._slice_by_size_exact(reader, max_size_bytes)
+                    return
+
+            # The fitz backend addresses pages by index, the PyPDF2 one by page object
+            with self.profiler.span("open"):
+                if self.options.slice_backend == "fitz":
+                    source = document.doc
+                    estimator = FitzPartSizeEstimator(source)
+                    page_at = int
+                else:
+                    source = document.reader
+                    estimator = PartSizeEstimator()
+                    page_at = source.pages.__getitem__
+            total_pages = document.page_count
+            if planned:
+                self._slice_by_size_planned(source, estimator, page_at, total_pages, max_size_bytes)
+                return
+            part_pages = []
+            part_number = 1
+
+            for i in range(total_pages):
+                if self.stop_processing:
+                    return
+
+                self.update_status(f"Processing page {i+1}/{total_pages}...",
+                                 10 + (i/total_pages)*80)
+
+                # Close the current part before the page that would push it over the limit
+                with self.profiler.span("estimate", i):
+                    cost, new_ids = estimator.page_cost(page_at(i))
+                if part_pages and estimator.size + cost > max_size_bytes:
+                    leftover = self._write_size_part(source, part_pages, part_number, max_size_bytes)
+                    part_number += 1
+                    estimator.reset()
+                    part_pages = []
+                    for j in leftover:
+                        estimator.add(*estimator.page_cost(page_at(j)))
+                        part_pages.append(j)
+                    cost, new_ids = estimator.page_cost(page_at(i))
+
+                estimator.add(cost, new_ids)
+                part_pages.append(i)
+
+            while part_pages and not self.stop_processing:
+                part_pages = self._write_size_part(source, part_pages, part_number, max_size_bytes)
+                part_number += 1
+
+        except Exception as e:
+            self.log(f"❌ Error slicing by size: {e}", 'error')
+            self.update_status("❌ Error occurred", 0)
+
+    def _size_part_path(self, part_number):
+        return os.path.join(self.options.output_dir, f"{Path(self.options.pdf_path).stem}_part_{part_number}.pdf")
+
+    def _write_size_part(self, source, page_indexes, part_number, max_size_bytes):
+        """Serialize one part once; returns trailing pages that must move to the next part"""
+        page_indexes, data, leftover = fit_part(source, page_indexes, max_size_bytes, self.options, self.profiler)
+        output_path = self._size_part_path(part_number)
+        with self.profiler.span("write"), open(output_path, 'wb') as output_file:
+            output_file.write(data)
+        self.outputs.append(output_path)
+
+        self.log(f"✅ Saved part {part_number}: {len(page_indexes)} pages, "
+               f"{len(data)/1024/1024:.1f} MB", 'success')
+        return leftover
+
+    def _slice_by_size_planned(self, source, estimator, page_at, total_pages, max_size_bytes):
+        """Measure every page once, fix all part boundaries, then write the parts independently"""
+        planner = SizePlanner(estimator)
+        for i in range(total_pages):
+            if self.stop_processing:
+                return
+            self.update_status(f"Measuring page {i+1}/{total_pages}...", 10 + (i/total_pages)*40)
+            with self.profiler.span("estimate", i):
+                planner.measure(page_at(i))
+        with self.profiler.span("plan"):
+            parts = planner.plan(int(max_size_bytes), self.options.balance_parts)
+        sizes = [size for _, _, size in parts]
+        self.log(f"📐 Planned {len(parts)} parts, estimated {min(sizes)/1024/1024:.1f}-"
+                 f"{max(sizes)/1024/1024:.1f} MB each", 'info')
+
+        if self.options.dry_run:
+            for number, (start, end, size) in enumerate(parts, 1):
+                self.log(f"   Part {number}: pages {start + 1}-{end} ({end - start} pages), "
+                         f"~{size/1024/1024:.2f} MB", 'info')
+            self.log("🧪 Dry run: no files written", 'info')
+            return
+
+        # Parts are written under temporary names and numbered in order as they finish,
+        # because verification may split a part whose estimate was too low
+        temp_dir = tempfile.mkdtemp(prefix=".slice-", dir=self.options.output_dir)
+        results = None
+        try:
+            workers = min(self.options.slice_workers, len(parts))
+            if workers > 1:
+                self.log(f"⚙️ Writing parts with {workers} worker processes", 'info')
+                results = self._iter_planned_parts_parallel(parts, max_size_bytes, temp_dir, workers)
+            else:
+                results = (write_planned_part(source, list(range(start, end)), max_size_bytes,
+                                              os.path.join(temp_dir, str(index)), self.options, self.profiler)
+                           for index, (start, end, _) in enumerate(parts))
+            part_number = 1
+            for index, outputs in enumerate(results):
+                if self.stop_processing:
+                    return
+                for pages, temp_path, size in outputs:
+                    os.replace(temp_path, self._size_part_path(part_number))
+                    self.outputs.append(self._size_part_path(part_number))
+                    self.log(f"✅ Saved part {part_number}: {pages} pages, {size/1024/1024:.1f} MB", 'success')
+                    part_number += 1
+                self.update_status(f"Saved {index + 1}/{len(parts)} parts...", 50 + (index + 1)/len(parts)*45)
+        finally:
+            if results is not None:
+                results.close()  # stops the workers before their files are removed
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _iter_planned_parts_parallel(self, parts, max_size_bytes, temp_dir, workers):
+        """Write planned parts in a process pool, yielding each part's outputs in plan order"""
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_slice_worker, initargs=(self.options,)
+        )
+        try:
+            futures = [executor.submit(_planned_part_worker, list(range(start, end)), max_size_bytes,
+                                       os.path.join(temp_dir, str(index)))
+                       for index, (start, end, _) in enumerate(parts)]
+            for future in futures:
+                while True:
+                    if self.stop_processing:
+                        return
+                    try:
+                        outputs = future.result(timeout=0.2)
+                        break
+                    except concurrent.futures.TimeoutError:
+                        continue
+                yield outputs
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _slice_by_size_exact(self, reader, max_size_bytes):
+        """Original strategy: re-serialize the whole part after every page"""
+        total_pages = len(reader.pages)
+
+        current_writer = PyPDF2.PdfWriter()
+        current_size = 0
+        part_number = 1
+        pages_in_current_part = 0
+
+        for i, page in enumerate(reader.pages):
+            if self.stop_processing:
+                return
+
+            self.update_status(f"Processing page {i+1}/{total_pages}...",
+                             10 + (i/total_pages)*80)
+
+            # Add page to current writer
+            current_writer.add_page(page)
+            pages_in_current_part += 1
+
+            # Estimate current size
+            temp_output = io.BytesIO()
+            current_writer.write(temp_output)
+            current_size = temp_output.tell()
+            temp_output.close()
+
+            # Check if we need to save current part
+            if current_size >= max_size_bytes or i == total_pages - 1:
+                if not self.stop_processing:
+                    output_path = os.path.join(
+                        self.options.output_dir,
+                        f"{Path(self.options.pdf_path).stem}_part_{part_number}.pdf"
+                    )
+                    with open(output_path, 'wb') as output_file:
+                        current_writer.write(output_file)
+                    self.outputs.append(output_path)
+
+                    self.log(f"✅ Saved part {part_number}: {pages_in_current_part} pages, "
+                           f"{current_size/1024/1024:.1f} MB", 'success')
+
+                    # Reset for next part
+                    current_writer = PyPDF2.PdfWriter()
+                    current_size = 0
+                    part_number += 1
+                    pages_in_current_part = 0
+
+    def convert_to_text(self):
+        if self.stop_processing:
+            return
+        self.update_status("📝 Converting to text with OCR...", 10)
+        self.log("📝 Starting advanced text extraction...", 'info')
+
+        output_path = os.path.join(self.options.output_dir,
+                                 f"{Path(self.options.pdf_path).stem}_text_ocr.txt")
+        writer = StreamingTextWriter(output_path)
+        journal = PageJournal(output_path + ".journal", PageJournal.make_fingerprint(
+            self.options, {"operation": "to_text", "ocr": self.options.enable_ocr,
+                           "lang": self.options.ocr_language, "dpi": self.options.ocr_dpi,
+                           "pixel_budget": self.options.ocr_pixel_budget,
+                           "grayscale": self.options.ocr_grayscale, "prescan": self.options.ocr_prescan}))
+
+        try:
+            workers = self.options.ocr_workers or os.cpu_count() or 1
+            document = self._open_document()
+            total_pages = document.page_count
+
+            finished_pages = journal.load() if self.options.resume else {}
+            journal.open(finished_pages)
+            if finished_pages:
+                self.log(f"📒 Resuming: {len(finished_pages)} of {total_pages} pages already done", 'info')
+            todo = [page_num for page_num in range(total_pages) if page_num not in finished_pages]
+            workers = min(workers, max(1, len(todo)))
+
+            plans = {}
+            # Classifying pages only decides what to OCR, so there is nothing to plan without OCR
+            if self.options.enable_ocr and self.options.ocr_prescan and todo:
+                plans = self._plan_pages(document.doc, todo, workers)
+                if self.stop_processing:
+                    return
+
+            if workers > 1 and len(todo) > 1:
+                self.log(f"⚙️ Using {workers} OCR worker processes", 'info')
+                page_results = self._iter_page_texts_parallel(todo, workers, plans)
+            else:
+                page_results = self._iter_page_texts(document.doc, todo, plans)
+
+            cache_hits = cache_misses = 0
+            for result in self._merge_finished_pages(total_pages, finished_pages, page_results):
+                if self.stop_processing:
+                    return
+
+                page_num = result.page_num
+                self.update_status(f"Processing page {page_num + 1}/{total_pages}...",
+                                 10 + (page_num/total_pages)*80)
+
+                if result.ocr_applied and page_num not in finished_pages:
+                    self.log(f"📖 OCR applied to page {page_num + 1} ({result.render_dpi:.0f} dpi)", 'info')
+                if result.ocr_error:
+                    self.log(f"⚠️ OCR failed for page {page_num + 1}: {result.ocr_error}", 'warning')
+                if result.ocr_cache_hit is not None:
+                    cache_hits += result.ocr_cache_hit
+                    cache_misses += not result.ocr_cache_hit
+                if result.spans:
+                    self.profiler.merge(result.spans)
+
+                with self.profiler.span("write", page_num):
+                    writer.write_block(f"--- Page {page_num + 1} ---\n{result.text}\n")
+                    # Pages whose OCR failed are redone on resume
+                    if page_num not in finished_pages and not result.ocr_error:
+                        journal.record(result)
+                self.log(f"✅ Page {page_num + 1} processed", 'info')
+
+            if self.ocr_cache:
+                self.log(f"🗄️ OCR cache: {cache_hits} hits, {cache_misses} misses", 'info')
+
+            # Save text file
+            if not self.stop_processing:
+                with self.profiler.span("write"):
+                    writer.commit()
+                self.outputs.append(output_path)
+                journal.remove()
+
+                self.log(f"✅ Text saved: {output_path}", 'success')
+                self.update_status("✅ Text extraction completed!", 100)
+
+        except Exception as e:
+            self.log(f"❌ Error in text conversion: {e}", 'error')
+            self.update_status("❌ Error occurred", 0)
+        finally:
+            self._close_text_writer(writer)
+            if os.path.exists(journal.path):
+                journal.close()
+                self.log(f"📒 Progress journal kept, rerun to resume: {journal.path}", 'warning')
+
+    @staticmethod
+    def _merge_finished_pages(total_pages, finished_pages, page_results):
+        """Interleave journaled pages with freshly processed ones, in page order"""
+        for page_num in range(total_pages):
+            if page_num in finished_pages:
+                yield finished_pages[page_num]
+            else:
+                result = next(page_results, None)
+                if result is None:
+                    return
+                yield result
+        next(page_results, None)  # let the page source finish and report
+
+    def _close_text_writer(self, writer):
+        if writer.close():
+            self.log(f"💾 Partial output kept: {writer.temp_path}", 'warning')
+
+    def _plan_pages(self, doc, page_nums, workers):
+        """Classify pages up front and log the OCR work plan"""
+        self.update_status("🗺️ Scanning pages...", 5)
+        classifier = PageClassifier(self.options)
+        pages = []
+        for page_num in page_nums:
+            if self.stop_processing:
+                break
+            with self.profiler.span("prescan", page_num):
+                pages.append(classifier.classify(doc[page_num], page_num))
+        plan = OCRPlan(pages)
+        self.log(f"🗺️ OCR plan: {plan.summary(workers)}", 'info')
+        return {page.page_num: page for page in pages}
+
+    def _iter_page_texts(self, doc, page_nums, plans=None):
+        """Render on one thread (fitz is not thread-safe) while OCR threads work on earlier pages"""
+        plans = plans or {}
+        memory = MemoryBudget(self.options.pipeline_memory_mb * 1024 * 1024)
+        should_stop = lambda: self.stop_processing  # noqa: E731
+
+        def render(page_num):
+            return render_page_for_ocr(doc, page_num, self.options, self.profiler, plans.get(page_num),
+                                       memory, should_stop)
+
+        def ocr(rendered):
+            result, img, held = rendered
+            try:
+                if img is not None:
+                    ocr_rendered_page(result, img, self.options, self.ocr_cache, self.profiler)
+            finally:
+                memory.release(held)
+            return result
+
+        pipeline = StagePipeline([PipelineStage("render", render),
+                                  PipelineStage("ocr", ocr, max(1, self.options.ocr_threads))],
+                                 self.options.pipeline_queue_size, should_stop)
+        yield from pipeline.run(page_nums)
+        if memory.peak:
+            self.log(f"🧠 Peak page-render memory in flight: {memory.peak / 1024 / 1024:.0f} MB", 'info')
+
+    def _iter_page_texts_parallel(self, page_nums, workers, plans=None):
+        """Render+OCR pages in a process pool, yielding results in page order"""
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_page_worker, initargs=(self.options,)
+        )
+        try:
+            # Keep a bounded window of pages in flight so a stop request leaves little queued work
+            pending = {}
+            submitted = 0
+            for index in range(len(page_nums)):
+                while submitted < len(page_nums) and submitted < index + workers * 2:
+                    page_num = page_nums[submitted]
+                    pending[submitted] = executor.submit(_page_worker, page_num, (plans or {}).get(page_num))
+                    submitted += 1
+                future = pending.pop(index)
+                while True:
+                    if self.stop_processing:
+                        return
+                    try:
+                        result = future.result(timeout=0.2)
+                        break
+                    except concurrent.futures.TimeoutError:
+                        continue
+                yield result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def extract_and_ocr(self):
+        if self.stop_processing:
+            return
+        self.update_status("🖼️ Extracting images and performing OCR...", 10)
+        self.log("🖼️ Starting image extraction and OCR...", 'info')
+
+        base_name = Path(self.options.pdf_path).stem
+        ocr_output_path = os.path.join(self.options.output_dir, f"{base_name}_ocr_results.txt")
+        writer = StreamingTextWriter(ocr_output_path)
+
+        try:
+            doc = self._open_document().doc
+            total_pages = len(doc)
+
+            # Create output directories
+            images_dir = os.path.join(self.options.output_dir, f"{base_name}_images")
+            os.makedirs(images_dir, exist_ok=True)
+
+            duplicate_refs = []
+            image_cache = ImageCache()
+            total_images_processed = 0
+            total_images_saved = 0
+
+            # extract (fitz, one thread) -> filter -> save -> OCR -> this loop, which writes in page order
+            memory = MemoryBudget(self.options.pipeline_memory_mb * 1024 * 1024)
+            pipeline = StagePipeline([
+                PipelineStage("extract", self._image_extractor(doc, memory)),
+                PipelineStage("filter", lambda page: self._filter_page_images(page, memory),
+                              max(1, self.options.filter_threads)),
+                PipelineStage("save", lambda page: self._save_page_images(page, images_dir, memory),
+                              max(1, self.options.save_threads)),
+                PipelineStage("ocr", lambda page: self._ocr_page_images(page, memory),
+                              max(1, self.options.ocr_threads)),
+            ], self.options.pipeline_queue_size, lambda: self.stop_processing)
+
+            for page_images in pipeline.run(range(total_pages)):
+                if self.stop_processing:
+                    return
+
+                page_num = page_images.page_num
+                self.update_status(f"Processing page {page_num + 1}/{total_pages}...",
+                                 10 + (page_num/total_pages)*80)
+                self.log(f"📄 Page {page_num + 1}: Found {len(page_images.jobs)} images", 'info')
+                page_ocr_text = []
+
+                for job in page_images.jobs:
+                    img_index = job.img_index
+                    total_images_processed += 1
+                    if job.error:
+                        self.log(f"⚠️ Error processing image {img_index + 1}: {job.error}", 'warning')
+                        continue
+
+                    # Repeated images (logos, letterheads) reuse the first occurrence's results
+                    record = image_cache.get_by_xref(job.xref)
+                    if record is None:
+                        record = image_cache.get_by_content(job.xref, job.content_key)
+                        if record is None:
+                            if job.record is None:
+                                self.log(f"⚠️ Error processing image {img_index + 1}: "
+                                       f"its first occurrence failed", 'warning')
+                                continue
+                            record = job.record
+                            image_cache.store(job.xref, job.content_key, record)
+                            if record.saved_filename:
+                                total_images_saved += 1
+                            if record.ocr_text:
+                                page_ocr_text.append(f"Image {img_index + 1}: {record.ocr_text}")
+                            continue
+
+                    if not record.accepted:
+                        self.log(f"⏭️ Page {page_num + 1}, Image {img_index + 1}: "
+                               f"Repeat of a filtered image", 'filter')
+                        continue
+                    if record.saved_filename:
+                        duplicate_refs.append(f"page_{page_num + 1}_img_{img_index + 1} -> {record.saved_filename}")
+                    if record.ocr_text:
+                        page_ocr_text.append(f"Image {img_index + 1}: {record.ocr_text}")
+                    self.log(f"♻️ Page {page_num + 1}, Image {img_index + 1}: "
+                           f"Repeat of {record.saved_filename or 'an earlier image'}", 'info')
+
+                # Add page OCR results
+                if page_ocr_text:
+                    with self.profiler.span("write", page_num):
+                        writer.write_block(f"--- Page {page_num + 1} ---\n" + "\n".join(page_ocr_text) + "\n")
+
+            if self.stop_processing:
+                return
+
+            # Record which pages reference an already saved image instead of writing it again
+            if duplicate_refs:
+                refs_path = os.path.join(images_dir, "duplicates.txt")
+                with open(refs_path, 'w', encoding='utf-8') as refs_file:
+                    refs_file.write('\n'.join(duplicate_refs) + '\n')
+                self.outputs.append(refs_path)
+
+            # Save OCR results
+            if writer.blocks_written:
+                with self.profiler.span("write"):
+                    writer.commit()
+                self.outputs.append(ocr_output_path)
+                self.log(f"✅ OCR results saved: {ocr_output_path}", 'success')
+
+            if self.ocr_cache:
+                self.log(f"🗄️ OCR cache: {self.ocr_cache.hits} hits, {self.ocr_cache.misses} misses", 'info')
+
+            # Summary
+            self.log(f"📊 Summary: {total_images_processed} images processed "
+                   f"({image_cache.hits} repeats reused, {image_cache.hit_rate:.0%} cache hit rate), "
+                   f"{total_images_saved} images saved", 'success')
+            self.log(f"🧠 Peak image memory in flight: {memory.peak / 1024 / 1024:.0f} MB", 'info')
+            self.update_status("✅ Image extraction and OCR completed!", 100)
+
+        except Exception as e:
+            self.log(f"❌ Error in image extraction: {e}", 'error')
+            self.update_status("❌ Error occurred", 0)
+        finally:
+            self._close_text_writer(writer)
+
+    def _image_extractor(self, doc, memory):
+        """Pipeline stage: decode each page's images once, in page order, on the fitz thread.
+
+        Repeats of an xref or of already seen pixels are passed on undecoded; the writer loop
+        resolves them from the ImageCache once their first occurrence has been processed.
+        """
+        seen_xrefs = set()
+        seen_keys = set()
+        should_stop = lambda: self.stop_processing  # noqa: E731
+
+        def extract(page_num):
+            with self.profiler.span("get_images", page_num):
+                image_list = doc[page_num].get_images()
+            jobs = []
+            for img_index, img in enumerate(image_list):
+                job = ImageJob(page_num, img_index, img[0])
+                jobs.append(job)
+                if job.xref in seen_xrefs or self.stop_processing:
+                    continue
+                # Reserve for the largest decode (RGBA) before the pixels exist
+                held = max(1, img[2] * img[3] * 4)
+                if not memory.acquire(held, should_stop):
+                    continue
+                try:
+                    with self.profiler.span("pixmap", page_num):
+                        pix = fitz.Pixmap(doc, job.xref)
+                    with self.profiler.span("hash", page_num):
+                        job.content_key = ImageCache.content_key(pix)
+                    seen_xrefs.add(job.xref)
+                    if job.content_key in seen_keys:
+                        continue
+                    seen_keys.add(job.content_key)
+
+                    # Log image details for debugging
+                    self.log(f"🔍 Page {page_num + 1}, Image {img_index + 1}: "
+                           f"{pix.width}x{pix.height}, {pix.n} channels", 'info')
+
+                    if self.options.image_save_mode == "original" and self.options.extract_images:
+                        with self.profiler.span("extract_original", page_num):
+                            original = original_image_stream(doc, job.xref)
+                        if original:
+                            job.raw_ext, job.raw_data = original
+
+                    # Handle CMYK images by converting them
+                    if pix.n - pix.alpha >= 4:  # CMYK
+                        self.log(f"🔄 Converting CMYK image {img_index + 1} to RGB", 'info')
+                        with self.profiler.span("convert", page_num):
+                            pix = fitz.Pixmap(fitz.csRGB, pix)
+                    elif self.options.extract_images and job.raw_data is None:
+                        job.icc_profile = image_icc_profile(doc, job.xref)
+
+                    # Decode once; the same PIL image goes through filtering, saving and OCR
+                    with self.profiler.span("convert", page_num):
+                        job.img = pixmap_to_pil(pix)
+                    job.channels = pix.n
+                    job.held_bytes, held = held, 0
+                except Exception as e:
+                    job.error = str(e)
+                finally:
+                    memory.release(held)
+            return PageImages(page_num, jobs)
+
+        return extract
+
+    def _filter_page_images(self, page_images, memory):
+        """Pipeline stage: filter the first occurrences on a page"""
+        for job in page_images.jobs:
+            if job.img is None:
+                continue
+            try:
+                self._filter_new_image(job)
+            except Exception as e:
+                job.error = str(e)
+            if job.error or not (job.save_pending or job.ocr_pending):
+                job.img = job.raw_data = None
+                memory.release(job.held_bytes)
+        return page_images
+
+    def _save_page_images(self, page_images, images_dir, memory):
+        """Pipeline stage: encode and write the accepted first occurrences on a page"""
+        for job in page_images.jobs:
+            if not job.save_pending or job.img is None:
+                continue
+            try:
+                self._save_new_image(job, images_dir)
+            except Exception as e:
+                job.error = str(e)
+            finally:
+                job.save_pending = False
+                job.raw_data = None
+            if job.error or not job.ocr_pending:
+                job.img = None
+                memory.release(job.held_bytes)
+        return page_images
+
+    def _ocr_page_images(self, page_images, memory):
+        """Pipeline stage: OCR the accepted first occurrences on a page"""
+        for job in page_images.jobs:
+            if not job.ocr_pending or job.img is None:
+                continue
+            try:
+                self._ocr_new_image(job)
+            finally:
+                job.img = None
+                job.ocr_pending = False
+                memory.release(job.held_bytes)
+        return page_images
+
+    def _filter_new_image(self, job):
+        """Filter the first occurrence of an image; sets job.record"""
+        page_num, img_index, img_pil = job.page_num, job.img_index, job.img
+
+        # In single-pass mode the OCR gate and the final OCR share one Tesseract run
+        single_pass = self.options.single_pass_ocr and self.options.smart_filtering and self.options.enable_ocr
+
+        # Check if image is worth processing (the PIL image stands in for the pixmap's size)
+        if not self.is_image_worth_processing(img_pil, page_num, img_index, img_pil, ocr_test=not single_pass):
+            job.record = ImageRecord(accepted=False)
+            return
+
+        if single_pass:
+            with self.profiler.span("enhance", page_num):
+                enhanced_img = self.enhance_image_for_ocr(img_pil)
+            with self.profiler.span("ocr", page_num):
+                has_text, ocr_reason, ocr_text = self.image_filter.ocr_with_confidence(
+                    enhanced_img, self.options.ocr_confidence_threshold, self.options.ocr_min_text_length,
+                    lang=self.options.ocr_language, ocr_cache=self.ocr_cache
+                )
+            if not has_text:
+                self.log(f"⏭️ Page {page_num + 1}, Image {img_index + 1}: {ocr_reason}", 'filter')
+                job.record = ImageRecord(accepted=False)
+                return
+            self.log(f"✅ Page {page_num + 1}, Image {img_index + 1}: {ocr_reason}", 'info')
+
+        record = job.record = ImageRecord(accepted=True)
+        job.save_pending = self.options.extract_images
+
+        if single_pass:
+            if ocr_text.strip():
+                record.ocr_text = ocr_text.strip()
+                self.log(f"📖 OCR completed for image {img_index + 1}: "
+                       f"{len(ocr_text.strip())} characters", 'success')
+        elif self.options.enable_ocr:
+            job.ocr_pending = True
+
+    def _save_new_image(self, job, images_dir):
+        """Write an accepted image: its original stream when there is one, otherwise a PNG"""
+        page_num, img_index, img_pil = job.page_num, job.img_index, job.img
+        if job.raw_data is not None:
+            img_filename = f"page_{page_num + 1}_img_{img_index + 1}.{job.raw_ext}"
+            with self.profiler.span("save", page_num), \
+                    open(os.path.join(images_dir, img_filename), 'wb') as image_file:
+                image_file.write(job.raw_data)
+            detail = f"original {job.raw_ext} stream"
+        else:
+            img_filename = f"page_{page_num + 1}_img_{img_index + 1}.png"
+            with self.profiler.span("save", page_num):
+                if job.icc_profile:
+                    img_pil.save(os.path.join(images_dir, img_filename), icc_profile=job.icc_profile)
+                else:
+                    img_pil.save(os.path.join(images_dir, img_filename))
+            detail = "png"
+        job.record.saved_filename = img_filename
+        self.outputs.append(os.path.join(images_dir, img_filename))
+        self.log(f"💾 Saved: {img_filename} ({img_pil.width}x{img_pil.height}, {detail})", 'success')
+
+    def _ocr_new_image(self, job):
+        img_index = job.img_index
+        try:
+            # Enhance image for better OCR
+            with self.profiler.span("enhance", job.page_num):
+                enhanced_img = self.enhance_image_for_ocr(job.img)
+
+            # Perform OCR with less restrictive character set
+            with self.profiler.span("ocr", job.page_num):
+                ocr_text = run_ocr(enhanced_img, '--psm 6', self.options.ocr_language, "string", self.ocr_cache)
+
+            if ocr_text.strip():
+                job.record.ocr_text = ocr_text.strip()
+                self.log(f"📖 OCR completed for image {img_index + 1}: "
+                       f"{len(ocr_text.strip())} characters", 'success')
+            else:
+                self.log(f"📖 OCR found no text in image {img_index + 1}", 'info')
+
+        except Exception as ocr_error:
+            self.log(f"⚠️ OCR failed for image {img_index + 1}: {ocr_error}", 'warning')
+
+    def enhance_image_for_ocr(self, img):
+        """Enhance image quality for better OCR results"""
+        try:
+            # Convert to grayscale if not already
+            if img.mode != 'L':
+                img = img.convert('L')
+
+            # Resize if too small (OCR works better on larger images)
+            if img.width < 300 or img.height < 300:
+                scale_factor = max(300 / img.width, 300 / img.height)
+                new_size = (int(img.width * scale_factor), int(img.height * scale_factor))
+                img = img.resize(new_size, Image.Resampling.LANCZOS)
+
+            # Enhance contrast
+            enhancer = ImageEnhance.Contrast(img)
+            img = enhancer.enhance(1.2)
+
+            # Enhance sharpness
+            enhancer = ImageEnhance.Sharpness(img)
+            img = enhancer.enhance(1.1)
+
+            return img
+
+        except Exception:
+            return img  # Return original if enhancement fails
+
+
+def is_batch_source(source):
+    """True if source names a folder or glob pattern rather than a single PDF"""
+    if os.path.isfile(source):
+        return False  # e.g. "Invoice [final].pdf", which only looks like a pattern
+    return os.path.isdir(source) or any(char in source for char in "*?[")
+
+
+def collect_batch_inputs(source):
+    """PDF files in a directory or matching a glob pattern, largest first"""
+    if os.path.isdir(source):
+        paths = [os.path.join(source, name) for name in os.listdir(source) if name.lower().endswith(".pdf")]
+    else:
+        paths = glob.glob(source, recursive=True)
+    paths = [path for path in paths if os.path.isfile(path)]
+    return sorted(paths, key=os.path.getsize, reverse=True)
+
+
+def plan_batch_outputs(pdf_paths, output_dir):
+    """Output directory per input: output_dir plus the input's folder relative to all inputs' common folder.
+
+    A recursive glob can match several files with one name (a/report.pdf, b/report.pdf); mirroring
+    their folders keeps their outputs and journals apart. Raises ValueError if two inputs would
+    still write to the same paths.
+    """
+    if not pdf_paths:
+        return {}
+    folders = {path: os.path.dirname(os.path.abspath(path)) for path in pdf_paths}
+    root = os.path.commonpath(list(folders.values()))
+    outputs = {}
+    claimed = {}
+    for path in pdf_paths:
+        target = os.path.normpath(os.path.join(output_dir, os.path.relpath(folders[path], root)))
+        key = (os.path.normcase(target), os.path.normcase(Path(path).stem))
+        if key in claimed:
+            raise ValueError(f"{claimed[key]} and {path} would write the same output files")
+        claimed[key] = path
+        outputs[path] = target
+    return outputs
+
+
+@dataclass
+class BatchFileResult:
+    """Outcome of one file in a batch run"""
+    pdf_path: str
+    status: str  # "completed", "failed" or "stopped"
+    seconds: float = 0.0
+    message: str = ""
+
+
+_batch_stop_event = None
+
+
+def _init_batch_worker(stop_event):
+    global _batch_stop_event
+    _batch_stop_event = stop_event
+
+
+def _run_batch_file(options):
+    """Run one file of a batch inside a pool process"""
+    started = time.perf_counter()
+    errors = []
+
+    def capture_errors(message, tag):
+        if tag == 'error':
+            errors.append(message.removeprefix("❌ "))
+
+    engine = PDFEngine(options, log_callback=capture_errors)
+    finished = threading.Event()
+
+    def forward_stop():
+        while not finished.is_set():
+            if _batch_stop_event.wait(0.2):
+                engine.stop()
+                return
+
+    threading.Thread(target=forward_stop, daemon=True).start()
+    try:
+        completed = engine.run()
+    except Exception as e:
+        errors.append(str(e))
+        completed = False
+    finally:
+        finished.set()
+        release_document(options.pdf_path)
+
+    seconds = time.perf_counter() - started
+    if errors:
+        return BatchFileResult(options.pdf_path, "failed", seconds, errors[0])
+    return BatchFileResult(options.pdf_path, "completed" if completed else "stopped", seconds)
+
+
+class BatchRunner:
+    """Runs one operation over many PDFs on a process pool, largest files first"""
+
+    def __init__(self, options: ProcessingOptions, pdf_paths, workers=1,
+                 log_callback: Optional[Callable[[str, str], None]] = None,
+                 status_callback: Optional[Callable[[str, Optional[float]], None]] = None):
+        self.options = options
+        self.pdf_paths = sorted(pdf_paths, key=os.path.getsize, reverse=True)
+        self.output_dirs = plan_batch_outputs(self.pdf_paths, options.output_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.log_callback = log_callback
+        self.status_callback = status_callback
+        self.stop_processing = False
+        self.results = []
+        self._stop_event = multiprocessing.Event()
+        self._futures = []
+
+    def log(self, message, tag='info'):
+        if self.log_callback:
+            self.log_callback(message, tag)
+
+    def update_status(self, status, progress=None):
+        if self.status_callback:
+            self.status_callback(status, progress)
+
+    def stop(self):
+        self.stop_processing = True
+        self._stop_event.set()
+        for future in self._futures:
+            future.cancel()
+
+    def run(self):
+        """Process every file; returns the list of BatchFileResult in completion order"""
+        total = len(self.pdf_paths)
+        if not total:
+            self.log("⚠️ No PDF files found for batch", 'warning')
+            return []
+        workers = min(self.workers, total)
+        self.update_status(f"📦 Batch of {total} files...", 0)
+        self.log(f"📦 Starting batch: {total} files, {workers} workers, operation {self.options.operation}", 'info')
+
+        started = time.perf_counter()
+        for output_dir in set(self.output_dirs.values()):
+            os.makedirs(output_dir, exist_ok=True)
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_batch_worker, initargs=(self._stop_event,)
+        ) as executor:
+            self._futures = [executor.submit(_run_batch_file, replace(self.options, pdf_path=path,
+                                                                      output_dir=self.output_dirs[path]))
+                             for path in self.pdf_paths]
+            if self.stop_processing:
+                self.stop()
+            by_future = dict(zip(self._futures, self.pdf_paths))
+            for done, future in enumerate(concurrent.futures.as_completed(self._futures), 1):
+                try:
+                    result = future.result()
+                except concurrent.futures.CancelledError:
+                    result = BatchFileResult(by_future[future], "stopped")
+                except Exception as e:
+                    result = BatchFileResult(by_future[future], "failed", message=str(e))
+                self.results.append(result)
+                self._log_result(result)
+                self.update_status(f"📦 {done}/{total} files done", done / total * 100)
+
+        elapsed = time.perf_counter() - started
+        counts = {status: sum(r.status == status for r in self.results)
+                  for status in ("completed", "failed", "stopped")}
+        self.log(f"📊 Batch summary: {total} files, {counts['completed']} completed, "
+                 f"{counts['failed']} failed, {counts['stopped']} stopped in {elapsed:.1f}s "
+                 f"({total / elapsed * 60:.1f} files/min)",
+                 'success' if not counts['failed'] else 'warning')
+        return self.results
+
+    def _log_result(self, result):
+        name = os.path.basename(result.pdf_path)
+        if result.status == "completed":
+            self.log(f"✅ {name}: completed in {result.seconds:.1f}s", 'success')
+        elif result.status == "failed":
+            self.log(f"❌ {name}: {result.message}", 'error')
+        else:
+            self.log(f"⏹️ {name}: stopped", 'warning')
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="PDF Processor Pro (headless mode)")
+    parser.add_argument("pdf_path", help="PDF file to process, or a folder / quoted glob pattern for a batch")
+    parser.add_argument("-o", "--output-dir", default=".", help="Directory for output files")
+    parser.add_argument("--operation", choices=list(OPERATIONS), default="slice_pages")
+    parser.add_argument("--start-page", type=int, default=1)
+    parser.add_argument("--end-page", type=int, default=None)
+    parser.add_argument("--ranges", dest="page_ranges", metavar="SPEC",
+                        help='slice_pages: several ranges in one pass, e.g. "1-12,13-40,41-"')
+    parser.add_argument("--split-by-outline", action="store_true",
+                        help="slice_pages: one file per top-level bookmark")
+    parser.add_argument("--slice-workers", type=int, default=1,
+                        help="Parallel processes for slice_pages ranges (fitz backend) and planned slice_size parts")
+    parser.add_argument("--max-size-mb", type=float, default=5.0)
+    parser.add_argument("--plan-parts", action="store_true",
+                        help="slice_size: plan every part boundary first, then write parts (in parallel with --slice-workers)")
+    parser.add_argument("--balance-parts", action="store_true",
+                        help="slice_size: planned parts of even size instead of a small last part")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="slice_size: print the planned parts and their estimated sizes, write nothing")
+    parser.add_argument("--size-accounting", choices=["incremental", "exact"], default="incremental",
+                        help="How slice_size measures parts (exact re-serializes after every page)")
+    parser.add_argument("--slice-backend", choices=["pypdf2", "fitz"], default="pypdf2",
+                        help="Library used to write sliced PDFs (fitz is native PyMuPDF and much faster)")
+    parser.add_argument("--text-backend", choices=["pypdf2", "fitz"], default="pypdf2",
+                        help="simple_text_extraction: library that reads the text layer (fitz is much faster)")
+    parser.add_argument("--text-workers", type=int, default=1,
+                        help="simple_text_extraction: extract page chunks in parallel processes")
+    parser.add_argument("--text-chunk-pages", type=int, default=100,
+                        help="simple_text_extraction: pages per parallel chunk")
+    parser.add_argument("--garbage", dest="fitz_garbage", type=int, choices=range(5), default=1,
+                        help="fitz backend: garbage collection level (3 merges duplicate objects, 4 also streams)")
+    parser.add_argument("--no-deflate", dest="fitz_deflate", action="store_false",
+                        help="fitz backend: keep uncompressed streams as they are")
+    parser.add_argument("--no-verify-size", dest="verify_part_size", action="store_false",
+                        help="Trust the size estimate instead of checking each serialized part")
+    parser.add_argument("--no-ocr", dest="enable_ocr", action="store_false")
+    parser.add_argument("--no-save-images", dest="extract_images", action="store_false")
+    parser.add_argument("--no-smart-filtering", dest="smart_filtering", action="store_false")
+    parser.add_argument("--min-image-size", type=int, default=150)
+    parser.add_argument("--ocr-threads", type=int, default=1,
+                        help="Pipeline threads running Tesseract while the next pages/images are prepared")
+    parser.add_argument("--filter-threads", type=int, default=1,
+                        help="extract_ocr: pipeline threads filtering images")
+    parser.add_argument("--save-threads", type=int, default=1,
+                        help="extract_ocr: pipeline threads encoding and writing saved images")
+    parser.add_argument("--image-save-mode", choices=["png", "original"], default="png",
+                        help="extract_ocr: 'original' writes embedded JPEG/JPEG 2000 streams as-is instead of PNG")
+    parser.add_argument("--memory-limit-mb", dest="pipeline_memory_mb", type=float, default=512.0,
+                        help="Ceiling on decoded page/image pixels held in the pipeline at once")
+    parser.add_argument("--ocr-workers", type=int, default=1,
+                        help="Processes used to OCR pages in to_text (0 = one per CPU core)")
+    parser.add_argument("--single-pass-ocr", action="store_true",
+                        help="In extract_ocr, decide and OCR each image with a single Tesseract run")
+    parser.add_argument("--ocr-confidence", type=int, default=30,
+                        help="Average word confidence an image needs to pass the OCR gate")
+    parser.add_argument("--ocr-min-text-length", type=int, default=3)
+    parser.add_argument("--lang", default="eng", help="Tesseract language(s), e.g. eng+deu")
+    parser.add_argument("--ocr-dpi", type=float, default=None,
+                        help="to_text: fixed page render DPI (default: chosen per page; 144 = old behaviour)")
+    parser.add_argument("--ocr-pixel-budget", type=float, default=12.0, metavar="MEGAPIXELS",
+                        help="to_text: largest page render in megapixels")
+    parser.add_argument("--no-prescan", dest="ocr_prescan", action="store_false",
+                        help="to_text: skip the page classification pass (OCR pages with under 50 characters)")
+    parser.add_argument("--ocr-grayscale", action="store_true", help="to_text: render pages in grayscale")
+    parser.add_argument("--ocr-backend", choices=["auto", *OCR_BACKENDS], default="auto",
+                        help="OCR engine; auto takes the first available")
+    parser.add_argument("--ocr-cache", dest="ocr_cache_dir", metavar="DIR",
+                        help="Directory for a persistent OCR result cache shared between runs")
+    parser.add_argument("--ocr-cache-size-mb", type=float, default=512.0)
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="to_text: ignore the journal of an interrupted run and start over")
+    parser.add_argument("--profile", action="store_true", help="Log a per-stage timing summary")
+    parser.add_argument("--profile-output", metavar="FILE", help="Export the stage profile to FILE")
+    parser.add_argument("--profile-format", choices=["json", "chrome"], default="json",
+                        help="json = aggregates, chrome = trace events for chrome://tracing / Perfetto")
+    parser.add_argument("--batch-workers", type=int, default=1,
+                        help="Files processed at once in batch mode (0 = one per CPU core)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only print warnings and errors")
+    return parser
+
+
+def cli_main(argv=None):
+    """Command line entry point; returns a process exit code"""
+    args = build_arg_parser().parse_args(argv)
+    batch = is_batch_source(args.pdf_path)
+    if not batch and not os.path.exists(args.pdf_path):
+        print(f"❌ PDF file not found: {args.pdf_path}", file=sys.stderr)
+        return 2
+    if not os.path.isdir(args.output_dir):
+        print(f"❌ Output directory does not exist: {args.output_dir}", file=sys.stderr)
+        return 2
+
+    options = ProcessingOptions(
+        pdf_path=args.pdf_path,
+        output_dir=args.output_dir,
+        operation=args.operation,
+        start_page=args.start_page,
+        end_page=args.end_page,
+        page_ranges=args.page_ranges,
+        split_by_outline=args.split_by_outline,
+        slice_workers=args.slice_workers,
+        plan_parts=args.plan_parts,
+        balance_parts=args.balance_parts,
+        dry_run=args.dry_run,
+        text_backend=args.text_backend,
+        text_workers=args.text_workers,
+        text_chunk_pages=args.text_chunk_pages,
+        max_size_mb=args.max_size_mb,
+        size_accounting=args.size_accounting,
+        verify_part_size=args.verify_part_size,
+        slice_backend=args.slice_backend,
+        fitz_garbage=args.fitz_garbage,
+        fitz_deflate=args.fitz_deflate,
+        enable_ocr=args.enable_ocr,
+        extract_images=args.extract_images,
+        smart_filtering=args.smart_filtering,
+        min_image_size=args.min_image_size,
+        ocr_workers=args.ocr_workers,
+        ocr_threads=args.ocr_threads,
+        filter_threads=args.filter_threads,
+        save_threads=args.save_threads,
+        image_save_mode=args.image_save_mode,
+        pipeline_memory_mb=args.pipeline_memory_mb,
+        single_pass_ocr=args.single_pass_ocr,
+        ocr_confidence_threshold=args.ocr_confidence,
+        ocr_min_text_length=args.ocr_min_text_length,
+        ocr_language=args.lang,
+        ocr_cache_dir=args.ocr_cache_dir,
+        ocr_cache_size_mb=args.ocr_cache_size_mb,
+        ocr_backend=args.ocr_backend,
+        ocr_dpi=args.ocr_dpi,
+        ocr_pixel_budget=int(args.ocr_pixel_budget * 1_000_000),
+        ocr_grayscale=args.ocr_grayscale,
+        ocr_prescan=args.ocr_prescan,
+        resume=args.resume,
+        profile=args.profile or bool(args.profile_output),
+        profile_output=args.profile_output,
+        profile_format=args.profile_format,
+    )
+
+    def print_log(message, tag='info'):
+        if args.quiet and tag not in ('warning', 'error'):
+            return
+        stream = sys.stderr if tag in ('warning', 'error') else sys.stdout
+        print(f"[{time.strftime('%H:%M:%S')}] {message}", file=stream, flush=True)
+
+    if batch:
+        pdf_paths = collect_batch_inputs(args.pdf_path)
+        if not pdf_paths:
+            print(f"❌ No PDF files found for batch: {args.pdf_path}", file=sys.stderr)
+            return 2
+        try:
+            runner = BatchRunner(options, pdf_paths, args.batch_workers, log_callback=print_log)
+        except ValueError as e:
+            print(f"❌ {e}", file=sys.stderr)
+            return 2
+        try:
+            results = runner.run()
+        except KeyboardInterrupt:
+            runner.stop()
+            return 130
+        if any(result.status == "failed" for result in results):
+            return 1
+        return 130 if any(result.status == "stopped" for result in results) else 0
+
+    engine = PDFEngine(options, log_callback=print_log)
+    try:
+        completed = engine.run()
+    except KeyboardInterrupt:
+        engine.stop()
+        return 130
+    if engine.error_count:
+        return 1
+    return 0 if completed else 130
+
+
+if __name__ == "__main__":
+    sys.exit(cli_main())